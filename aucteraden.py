@@ -1,9 +1,9 @@
 import argparse
-import random
 import numpy as np
 from aucteraden.agent import OneMoveScoreBot, RandomBot
 from aucteraden.board import GameState
 from aucteraden.encoders import GameStateEncoder, MoveEncoder
+from aucteraden.seeding import AGENT_STREAM, DEAL_STREAM, game_rng
 from decktet.deck import Deck
 
 def main():
@@ -41,17 +41,14 @@ def main():
 	labels_fn   = f"{base_fn}L"
 	output_fn =   f"{base_fn}.log"
 
-	random.seed(args.seed)
-
 	counter = 0
 	with open(output_fn, "w") as file:
 		for i in range(args.num_games):
 			print(f"\n======== Game {i} ========", file=file)
 			
-			game = None
-			#random.seed(args.seed + i)
-			game = GameState.new_game()
-			#random.seed(args.seed + i)
+			# Deal and bot choices depend only on (seed, game index)
+			game = GameState.new_game(keep_states=0, rng=game_rng(args.seed, i, DEAL_STREAM))
+			bot.rng = game_rng(args.seed, i, AGENT_STREAM)
 
 			turn_counter = 0
 			while not game.is_over():
@@ -0,0 +1,128 @@
+import numpy as np
+from aucteraden.bitboard import SUIT_COUNT
+from decktet.card import Card
+from decktet.deck import CARD_COUNT
+
+
+MARKET_SIZE = 3
+CHURN_ACTION = 0
+
+
+def _make_payments():
+	# Every way to pay up to two chips: nothing, one chip, two chips of one
+	# suit, one chip each of two suits. Payments are (suit, count) pairs.
+	payments = [()]
+	for suit in range(SUIT_COUNT):
+		payments.append(((suit, 1),))
+	for suit in range(SUIT_COUNT):
+		payments.append(((suit, 2),))
+	for first in range(SUIT_COUNT):
+		for second in range(first + 1, SUIT_COUNT):
+			payments.append(((first, 1), (second, 1)))
+	return tuple(payments)
+
+
+PAYMENTS = _make_payments()
+PAYMENT_INDEX = {payment: idx for idx, payment in enumerate(PAYMENTS)}
+PAYMENT_VECTORS = np.array([[dict(payment).get(suit, 0) for suit in range(SUIT_COUNT)] for payment in PAYMENTS], dtype=np.int8)
+PAYMENT_COSTS = PAYMENT_VECTORS.sum(axis=1).astype(np.int8)
+PAYMENT_MASKS = np.array([sum(1 << suit for suit, _ in payment) for payment in PAYMENTS], dtype=np.uint8)
+
+
+def payment_index(payment):
+	return PAYMENT_INDEX[tuple(sorted((suit.value, count) for suit, count in payment.items() if count))]
+
+
+_payment_options = {}
+
+
+def payment_options(card, cost):
+	# Payment indexes the card may be bought with at the given cost, in the
+	# same order as Agent.chip_combos
+	key = (card.index, cost)
+	if key not in _payment_options:
+		suits = [suit.value for suit in card.suits_list]
+		options = [()]
+		if cost == 1 and suits:
+			options = [((suit, 1),) for suit in suits]
+		elif cost == 2 and suits:
+			options = [((first, 1), (second, 1)) for i, first in enumerate(suits) for second in suits[i + 1:]]
+			options += [((suit, 2),) for suit in suits]
+		_payment_options[key] = tuple(PAYMENT_INDEX[tuple(sorted(option))] for option in options)
+	return _payment_options[key]
+
+
+def _make_payment_option_masks():
+	# (card, cost, payment) -> payment is one of payment_options(card, cost)
+	masks = np.zeros((CARD_COUNT, MARKET_SIZE, len(PAYMENTS)), dtype=np.bool_)
+	for card in Card.registry:
+		for cost in range(MARKET_SIZE):
+			masks[card.index, cost, list(payment_options(card, cost))] = True
+	return masks
+
+
+PAYMENT_OPTION_MASKS = _make_payment_option_masks()
+
+
+def cell_mask(mask, cell_count):
+	# Bitmask of cells as a boolean array
+	bits = np.frombuffer(mask.to_bytes(8, "little"), dtype=np.uint8)
+	return np.unpackbits(bits, bitorder="little")[:cell_count].astype(np.bool_)
+
+
+def legal_action_mask(board):
+	# Boolean array over board.actions, True for every legal action. Churn
+	# is always legal.
+	actions = board.actions
+	mask = np.zeros(actions.count, dtype=np.bool_)
+	mask[CHURN_ACTION] = True
+	market = board.market
+	if not market:
+		return mask
+	affordable = (PAYMENT_VECTORS <= np.array(board.bits.chips)).all(axis=1)
+	moves = mask[1:].reshape(actions.market_size, actions.payment_count, actions.cell_count)
+	for buy, card in enumerate(market):
+		payments = PAYMENT_OPTION_MASKS[card.index, len(market) - buy - 1] & affordable
+		cells = cell_mask(board.bits.legal_placements(card.type), actions.cell_count)
+		moves[buy] = payments[:, None] & cells[None, :]
+	return mask
+
+
+class ActionSpace:
+	# Fixed integer action space: 0 is churn, every other action is
+	# (market index, payment index, cell) flattened in that order
+	def __init__(self, col_count, row_count, market_size=MARKET_SIZE):
+		self.col_count = col_count
+		self.row_count = row_count
+		self.cell_count = col_count * row_count
+		self.market_size = market_size
+		self.payment_count = len(PAYMENTS)
+		self.count = 1 + market_size * self.payment_count * self.cell_count
+
+		actions = np.arange(self.count - 1)
+		self.buy = np.full(self.count, -1, dtype=np.int16)
+		self.payment = np.full(self.count, -1, dtype=np.int16)
+		self.cell = np.full(self.count, -1, dtype=np.int16)
+		self.buy[1:] = actions // (self.payment_count * self.cell_count)
+		self.payment[1:] = actions // self.cell_count % self.payment_count
+		self.cell[1:] = actions % self.cell_count
+
+		# Plain tuples for scalar lookups, which are much faster than
+		# indexing NumPy arrays one element at a time
+		self.table = ((None, None, None),) + tuple(zip(self.buy[1:].tolist(), self.payment[1:].tolist(), self.cell[1:].tolist()))
+
+	def encode(self, buy, payment, cell):
+		return 1 + (buy * self.payment_count + payment) * self.cell_count + cell
+
+	def decode(self, action):
+		return self.table[action]
+
+
+_action_spaces = {}
+
+
+def action_space(col_count, row_count):
+	key = (col_count, row_count)
+	if key not in _action_spaces:
+		_action_spaces[key] = ActionSpace(col_count, row_count)
+	return _action_spaces[key]
@@ -1,212 +1,503 @@
 import copy
+import math
 import random
+import time
 
 import numpy as np
-import tensorflow as tf
-from aucteraden.board import Board, Move
+from aucteraden.actions import CHURN_ACTION, PAYMENT_VECTORS
+from aucteraden.bitboard import SUIT_COUNT
+from aucteraden.board import Move
+from aucteraden.chance import draw_average, position_key, unseen_cards
 from aucteraden.encoders import GameStateEncoder, MoveEncoder
+from aucteraden.movegen import chip_combos, legal_actions
+from aucteraden.seeding import rng_choice, rng_sample
+from aucteraden.transposition import TranspositionTable
+from decktet.deck import Deck
+
+
+def best_score_candidates(board, max_candidates_count, table=None):
+	# Actions that reached a new best (or equal) one-move score, in the order
+	# the market is scanned: last card first, then payments, then cells.
+	# Once the grid has cards, scanning stops at max_candidates_count.
+	actions = legal_actions(board)
+	candidates = []
+	best_score = -100000000
+	for action, next_score in zip(actions, board.score_moves(actions, table).tolist()):
+		#print(f"select_move {Move.from_action(action, board.actions)}: score {next_score}: {next_score >= best_score}")
+		if next_score >= best_score:
+			candidates.append(action)
+			best_score = next_score
+			if not board.grid_empty and len(candidates) == max_candidates_count:
+				break
+	return candidates
+
+
+def select_score_candidate(board, candidates, upper_limit, rng):
+	# Any candidate on an empty grid, else one of the last upper_limit (the
+	# best scores); churn when there is none
+	#print("\nValid moves: " + str(len(candidates)))
+	if len(candidates) == 0:
+		return Move.churn()
+	if not board.grid_empty:
+		return Move.from_action(rng_choice(rng, candidates[-upper_limit:]), board.actions)
+	return Move.from_action(rng_choice(rng, candidates), board.actions)
+
+
+def one_move_score_move(board, max_candidates_count, upper_limit, rng, table=None, book=None):
+	# The move of the one-move score bots. With an OpeningBook, first moves
+	# found in it are not searched.
+	if book is not None and board.grid_empty:
+		action = book.lookup(board, rng)
+		if action is not None:
+			return Move.from_action(action, board.actions)
+	candidates = best_score_candidates(board, max_candidates_count, table)
+	return select_score_candidate(board, candidates, upper_limit, rng)
 
 
 class Agent:
-	def __init__(self):
-		pass
+	def __init__(self, rng=None):
+		# Each agent draws from its own random.Random or NumPy Generator,
+		# through the rng_ helpers of aucteraden.seeding; the global random
+		# module is used only when none is given
+		self.rng = rng if rng is not None else random
 
 	def select_move(self, game_state):
 		raise NotImplementedError()
+
+	def random_move(self, board):
+		# Any legal buy and place, churn only when there is none
+		candidates = legal_actions(board)
+		#print("\nValid moves: " + str(len(candidates)))
+		if len(candidates) == 0:
+			return Move.churn()
+		return Move.from_action(rng_choice(self.rng, candidates), board.actions)
 	
 	def chip_combos(self, card, cost):
-		suit_count = len(card.suits_list)
-		if cost == 1:
-			if suit_count == 1:
-				return [{card.suits_list[0]: 1}]
-			elif suit_count == 2:
-				return [{card.suits_list[0]: 1}, {card.suits_list[1]: 1}]
-		elif cost == 2:
-			if suit_count == 1:
-				return [{card.suits_list[0]: 2}]
-			elif suit_count == 2:
-				return [{card.suits_list[0]: 1, card.suits_list[1]: 1}, {card.suits_list[0]: 2}, {card.suits_list[1]: 2}]
-		return [{}]
+		return chip_combos(card, cost)
 
 
 class GymAgent(Agent):
-	def __init__(self):
-		super().__init__()
-		self.game_state_encoder = GameStateEncoder()
-		self.move_encoder = MoveEncoder()
+	def __init__(self, rng=None, verbose=False, variant=None):
+		# variant must be the env's, the encoders depend on its grid size
+		super().__init__(rng)
+		self.verbose = verbose
+		self.game_state_encoder = GameStateEncoder(variant)
+		self.move_encoder = MoveEncoder(variant)
+
+	def get_board(self, obs, info=None):
+		# The env passes its live board in info; it is only read here. An
+		# observation is decoded only when there is nothing else.
+		if info is not None and "board" in info:
+			return info["board"]
+		return self.game_state_encoder.decode(obs)
 
-	def get_action(self, obs):
-		board = self.game_state_encoder.decode(obs)
-		move = self.select_move(board)
+	def get_action(self, obs, info=None):
+		move = self.select_move(self.get_board(obs, info))
 		result = self.move_encoder.encode(move)
-		print(f"move: {move}\nget_action: {result}")
+		if self.verbose:
+			print(f"move: {move}\nget_action: {result}")
 		return result
 
 
 class RandomBot(Agent):
 	def select_move(self, game_state):
-		candidates = []
-		cost = 0
-		for mcard in reversed(game_state.board.market):
-			idx = len(game_state.board.market) - cost - 1
-			for chips in self.chip_combos(mcard, cost):
-				for col, row in game_state.board.free_cells:
-					move = Move.buy_and_place(idx, chips, col, row)
-					if game_state.board.is_valid_move(move, True):
-						candidates.append(move)
-			cost += 1
-		#print("\nValid moves: " + str(len(candidates)))
-		if len(candidates) == 0:
-			return Move.churn()
-		return random.choice(candidates)
+		return self.random_move(game_state.board)
 
 
 class OneMoveScoreBot(Agent):
-	def __init__(self, max_candidates_count, upper_limit):
-		super().__init__()
+	def __init__(self, max_candidates_count, upper_limit, table=None, rng=None, book=None):
+		super().__init__(rng)
 		self.max_candidates_count = max_candidates_count
 		self.upper_limit = upper_limit
+		self.table = table
+		self.book = book
 
 	def select_move(self, game_state):
-		candidates = []
-		best_score = -100000000
-		cost = 0
-		for mcard in reversed(game_state.board.market):
-			idx = len(game_state.board.market) - cost - 1
-			#print(f"select_move {idx}: {mcard}, cost {cost}")
-			for chips in self.chip_combos(mcard, cost):
-				for col, row in game_state.board.free_cells:
-					move = Move.buy_and_place(idx, chips, col, row)
-					if game_state.board.is_valid_move(move, True):
-						next_state = game_state.apply_move(move)
-						next_score, _ = next_state.board.calculate_score()
-						#print(f"select_move {idx}: ({col}, {row}), {mcard}, cost {cost}, score {next_score}: {next_score >= best_score}")
-						if next_score >= best_score:
-							candidates.append(move)
-							best_score = next_score
-							if not game_state.board.grid_empty and len(candidates) == self.max_candidates_count:
-								return self.select_candidate(game_state, candidates)
-			cost += 1
-		return self.select_candidate(game_state, candidates)
-	
-	def select_candidate(self, game_state, candidates):
-		#print("\nValid moves: " + str(len(candidates)))
-		if len(candidates) == 0:
-			return Move.churn()
-		if not game_state.board.grid_empty:
-			return random.choice(candidates[-self.upper_limit:])
-		return random.choice(candidates)
+		return one_move_score_move(game_state.board, self.max_candidates_count, self.upper_limit, self.rng, self.table, self.book)
 
 
 class RandomGymBot(GymAgent):
-	def __init__(self):
-		super().__init__()
+	def __init__(self, rng=None, verbose=False, variant=None):
+		super().__init__(rng, verbose, variant)
 
 	def select_move(self, board):
-		candidates = []
-		cost = 0
-		for mcard in reversed(board.market):
-			idx = len(board.market) - cost - 1
-			for chips in self.chip_combos(mcard, cost):
-				for col, row in board.free_cells:
-					move = Move.buy_and_place(idx, chips, col, row)
-					if board.is_valid_move(move, True):
-						candidates.append(move)
-			cost += 1
-		#print("\nValid moves: " + str(len(candidates)))
-		if len(candidates) == 0:
-			return Move.churn()
-		return random.choice(candidates)
+		return self.random_move(board)
 
 
 class OneMoveScoreGymBot(GymAgent):
-	def __init__(self, max_candidates_count, upper_limit):
-		super().__init__()
+	def __init__(self, max_candidates_count, upper_limit, table=None, rng=None, verbose=False, book=None, variant=None):
+		super().__init__(rng, verbose, variant)
 		self.max_candidates_count = max_candidates_count
 		self.upper_limit = upper_limit
+		self.table = table
+		self.book = book
 
 	def select_move(self, board):
-		candidates = []
-		best_score = -100000000
-		cost = 0
-		for mcard in reversed(board.market):
-			idx = len(board.market) - cost - 1
-			#print(f"select_move {idx}: {mcard}, cost {cost}")
-			for chips in self.chip_combos(mcard, cost):
-				for col, row in board.free_cells:
-					move = Move.buy_and_place(idx, chips, col, row)
-					if board.is_valid_move(move, True):
-						next_board = board.apply_move(move)
-						next_score, _ = next_board.calculate_score()
-						#print(f"select_move {idx}: ({col}, {row}), {mcard}, cost {cost}, score {next_score}: {next_score >= best_score}")
-						if next_score >= best_score:
-							candidates.append(move)
-							best_score = next_score
-							if not board.grid_empty and len(candidates) == self.max_candidates_count:
-								return self.select_candidate(board, candidates)
-			cost += 1
-		return self.select_candidate(board, candidates)
-	
-	def select_candidate(self, board, candidates):
-		#print("\nValid moves: " + str(len(candidates)))
-		if len(candidates) == 0:
-			return Move.churn()
-		if not board.grid_empty:
-			return random.choice(candidates[-self.upper_limit:])
-		return random.choice(candidates)
+		return one_move_score_move(board, self.max_candidates_count, self.upper_limit, self.rng, self.table, self.book)
+
+
+# Suits paid by each payment, to sum the model's chip outputs per payment
+PAYMENT_SUITS = (PAYMENT_VECTORS > 0).astype(np.float32)
+
+
+def model_action_scores(mtx, actions):
+	# Rank of every action for each row of model outputs laid out like
+	# MoveEncoder: 100 * buy + 10 * chips paid + cell. Churn is never ranked.
+	mtx = np.asarray(mtx, dtype=np.float32)
+	chips = mtx[:, MoveEncoder.CHIP_OFFSET:MoveEncoder.CHIP_OFFSET + SUIT_COUNT] @ PAYMENT_SUITS.T
+	scores = np.empty((len(mtx), actions.count), dtype=np.float32)
+	scores[:, CHURN_ACTION] = -np.inf
+	scores[:, 1:] = 100 * mtx[:, MoveEncoder.BUY_OFFSET + actions.buy[1:]] + 10 * chips[:, actions.payment[1:]] + mtx[:, MoveEncoder.BOARD_COL_OFFSET + actions.cell[1:]]
+	return scores
+
+
+def compile_model(model):
+	# Batch of observations -> model outputs, one MoveEncoder row each. The
+	# call is traced once for every batch size, without predict()'s per call
+	# setup. TensorFlow is imported here, so processes that only play (see
+	# aucteraden/inference.py) never load it.
+	import tensorflow as tf
+	input_size = model.inputs[0].shape[-1]
+	forward = tf.function(lambda x: model(x, training=False), input_signature=[tf.TensorSpec((None, input_size), tf.float32)])
+
+	def predict(observations):
+		batch = np.asarray(observations, dtype=np.float32).reshape(-1, input_size)
+		outputs = forward(tf.constant(batch))
+		if not isinstance(outputs, (list, tuple)):
+			outputs = [outputs]
+		return np.concatenate([np.asarray(t).reshape(len(batch), -1) for t in outputs], axis=1)
+	return predict
+
+
+def checkpoint_path_of(model):
+	return f"aucteraden/training_1/{model.name}.weights.h5"
 
 
 class ModelGymBot(GymAgent):
-	def __init__(self, model):
-		super().__init__()
+	def __init__(self, model=None, verbose=False, checkpoint_path=None, variant=None, predict=None):
+		# predict maps a batch of observations to model outputs, as
+		# compile_model() does; without it, model is loaded and compiled
+		super().__init__(verbose=verbose, variant=variant)
 		self.model = model
-		self.model.summary()
-		checkpoint_path = f"aucteraden/training_1/{self.model.name}.weights.h5"
-		print(f"Load weights from {checkpoint_path}")
-		self.model.load_weights(checkpoint_path)
-
-	def get_action(self, obs):
-		predict_board = obs.reshape(1, 120)
-		move_probs = self.model.predict(predict_board)
-		flattened_tensors = [tf.reshape(t, [-1]) for t in move_probs]
-		mtx = tf.concat(flattened_tensors, axis=0)
-		print(self.move_encoder.decode_predict(mtx))
-		mtx = np.array(mtx)
-		#if mtx[MoveEncoder.CHURN_OFFSET] == 1:
-		#	return Move.churn()
-		board = self.game_state_encoder.decode(obs)
-		print(f"Board: {board}")
-
-		candidates = []
-		cost = 0
-		for mcard in reversed(board.market):
-			#print(f"Market card: {mcard}")
-			idx = len(board.market) - cost - 1
-			buy_prob = mtx[MoveEncoder.BUY_OFFSET + idx]
-			for chips in self.chip_combos(mcard, cost):
-				chip_prob = 0
-				for suit, count in chips.items():
-					chip_prob += mtx[MoveEncoder.CHIP_OFFSET + suit.value]
-				for col, row in board.free_cells:
-					grid_prob = mtx[MoveEncoder.BOARD_COL_OFFSET + col + row * Board.col_count]
-					move = Move.buy_and_place(idx, chips, col, row)
-					is_valid = board.is_valid_move(move, True)
-					#print(f"Check move: {move} = {is_valid}") 
-					if is_valid:
-						prob = 100 * buy_prob + 10 * chip_prob + grid_prob
-						#print(f"Move: {move}, prob {buy_prob} + {chip_prob} + {grid_prob} = {prob}")
-						candidates.append((prob, move))
-			cost += 1
+		if predict is None:
+			if model is None:
+				raise ValueError("ModelGymBot needs a model or a predict function")
+			self.model.summary()
+			if checkpoint_path is None:
+				checkpoint_path = checkpoint_path_of(self.model)
+			print(f"Load weights from {checkpoint_path}")
+			self.model.load_weights(checkpoint_path)
+			predict = compile_model(self.model)
+		self.predict = predict
 
-		if len(candidates) == 0:
-			print(f"Move failed, churn")
-			move = Move.churn()
-			return self.move_encoder.encode(move)
-
-		candidates.sort(reverse=True, key=lambda item: item[0])
-		#for prob, move in candidates:
-		#	print(f"{prob}: {move}")
-		_, move = candidates[0]
-		result = self.move_encoder.encode(move)
-		print(f"Best move: {move}")
+	def get_action(self, obs, info=None):
+		return self.get_actions([obs], [info])[0]
+
+	def get_actions(self, observations, infos=None):
+		# Actions for several envs from a single forward pass. infos is a
+		# list of info dicts, or None to decode every observation.
+		mtx = self.predict(observations)
+		boards = [self.get_board(obs, infos[i] if infos is not None else None) for i, obs in enumerate(observations)]
+		result = []
+		for i, board in enumerate(boards):
+			scores = model_action_scores(mtx[i:i + 1], board.actions)[0]
+			if self.verbose:
+				print(self.move_encoder.decode_predict(mtx[i]))
+				print(f"Board: {board}")
+			legal = legal_actions(board)
+			if not legal:
+				if self.verbose:
+					print(f"Move failed, churn")
+				result.append(self.move_encoder.encode(Move.churn()))
+				continue
+			# The first best in move generator order, as the sort used to pick
+			action = legal[int(np.argmax(scores[legal]))]
+			move = Move.from_action(action, board.actions)
+			if self.verbose:
+				print(f"Best move: {move}")
+			result.append(self.move_encoder.encode(move))
 		return result
+
+
+class ExpectimaxBot(Agent):
+	# Depth-limited expectimax. Max nodes try the `width` best moves by
+	# one-move score, chance nodes deal what refill_market would deal from
+	# the unseen cards: the deck's contents, never its order. Up to
+	# `samples` cards are tried per draw, all of them when fewer remain.
+	# With a time budget the search deepens one ply at a time and plays
+	# the move of the deepest finished search.
+	def __init__(self, depth=2, width=6, samples=6, time_budget=None, table=None, rng=None):
+		super().__init__(rng)
+		self.depth = depth
+		self.width = width
+		self.samples = samples
+		self.time_budget = time_budget
+		self.table = table if table is not None else TranspositionTable()
+		self.chain_table = TranspositionTable()
+		self.deadline = None
+		self.timed_out = False
+		self.nodes = 0
+		self.searched_depth = 0
+
+	def select_move(self, game_state):
+		return self.select_board_move(game_state.board)
+
+	def select_board_move(self, board):
+		# The search makes and unmakes moves on a single copy
+		board = board.copy()
+		unseen, unseen_key = unseen_cards(board)
+		self.deadline = None
+		if self.time_budget is not None:
+			self.deadline = time.perf_counter() + self.time_budget
+		self.timed_out = False
+		self.nodes = 0
+
+		# Depth 1 is the one-move score order itself
+		actions, _ = self.candidates(board)
+		best_action = actions[0]
+		self.searched_depth = 1
+		first = 2 if self.deadline is not None else max(self.depth, 2)
+		for depth in range(first, self.depth + 1):
+			action = self.search_root(board, actions, unseen, unseen_key, depth)
+			if self.timed_out:
+				break
+			best_action = action
+			self.searched_depth = depth
+		return Move.from_action(best_action, board.actions)
+
+	def candidates(self, board):
+		# The best moves by one-move score, ties in move generator order
+		actions = legal_actions(board) or [CHURN_ACTION]
+		scores = board.score_moves(actions, self.chain_table).tolist()
+		order = sorted(range(len(actions)), key=lambda i: -scores[i])[:self.width]
+		return [actions[i] for i in order], [scores[i] for i in order]
+
+	def search_root(self, board, actions, unseen, unseen_key, depth):
+		best_action = None
+		best_value = None
+		for action in actions:
+			value = self.move_value(board, action, unseen, unseen_key, depth)
+			if self.timed_out:
+				return None
+			if best_value is None or value > best_value:
+				best_action = action
+				best_value = value
+		return best_action
+
+	def move_value(self, board, action, unseen, unseen_key, depth):
+		undo = board.make_move(action)
+		value = self.draw_value(board, unseen, unseen_key, depth - 1, True)
+		board.unmake_move(action, undo)
+		return value
+
+	def max_value(self, board, unseen, unseen_key, depth):
+		self.nodes += 1
+		if not unseen or board.bits.free == 0:
+			return board.quick_score()
+		if self.deadline is not None and time.perf_counter() > self.deadline:
+			self.timed_out = True
+			return 0
+		key = position_key(board, unseen_key)
+		value = self.table.get(key, depth)
+		if value is not None:
+			return board.score + value
+		actions, scores = self.candidates(board)
+		if depth == 1:
+			value = scores[0]
+		else:
+			value = max(self.move_value(board, action, unseen, unseen_key, depth) for action in actions)
+		if not self.timed_out:
+			self.table.put(key, value - board.score, depth)
+		return value
+
+	def draw_value(self, board, unseen, unseen_key, depth, is_discard):
+		count = len(unseen)
+		if count == 0:
+			return self.max_value(board, unseen, unseen_key, depth)
+		if self.samples is None or count <= self.samples:
+			positions = range(count)
+		else:
+			positions = rng_sample(self.rng, count, self.samples)
+
+		def value(board, unseen, unseen_key, short):
+			if short:
+				return self.draw_value(board, unseen, unseen_key, depth, False)
+			return self.max_value(board, unseen, unseen_key, depth)
+		return draw_average(board, unseen, unseen_key, positions, is_discard, value, lambda: self.timed_out)
+
+
+class SearchNode:
+	# A decision node's children are chance nodes keyed by action; a chance
+	# node's children are decision nodes keyed by the market dealt after
+	# the move
+	__slots__ = ("visits", "total", "children", "untried")
+
+	def __init__(self):
+		self.visits = 0
+		self.total = 0.0
+		self.children = {}
+		self.untried = None
+
+
+class ISMCTSSearch:
+	# Information set MCTS: every playout deals the unseen cards in a new
+	# random order, descends the tree with UCB1 and finishes the game with
+	# a random or greedy (one-move score) rollout. The subtree of the move
+	# played and the market then dealt is kept for the next decision.
+	def __init__(self, playouts=1000, time_budget=None, exploration=10.0, rollout="random", reuse=True):
+		if playouts is None and time_budget is None:
+			raise ValueError("ISMCTSSearch needs a playout count or a time budget")
+		self.playouts = playouts
+		self.time_budget = time_budget
+		self.exploration = exploration
+		self.rollout = rollout
+		self.reuse = reuse
+		self.next_roots = None
+		self.reuse_key = None
+		self.last_root = None
+		self.last_playouts = 0
+		self.last_elapsed = 0.0
+		self.reused_visits = 0
+		self.total_playouts = 0
+		self.total_elapsed = 0.0
+
+	def reset(self):
+		self.next_roots = None
+		self.reuse_key = None
+
+	def stats(self):
+		return {
+			"playouts": self.last_playouts,
+			"elapsed": self.last_elapsed,
+			"playouts_per_second": self.last_playouts / self.last_elapsed if self.last_elapsed else 0.0,
+			"reused_visits": self.reused_visits,
+			"total_playouts": self.total_playouts,
+			"total_playouts_per_second": self.total_playouts / self.total_elapsed if self.total_elapsed else 0.0,
+		}
+
+	def unseen_cards(self, board):
+		if len(board.deck):
+			return list(board.deck.order[board.deck.top:])
+		# A board decoded from an observation has no deck: assume every card
+		# that is not on the table is still to come
+		seen = set(card.index for card in board.grid if card is not None)
+		seen.update(card.index for card in board.market)
+		return [idx for idx in board.variant.deck.order if idx not in seen]
+
+	def find_root(self, board):
+		if self.reuse and self.next_roots is not None and self.reuse_key == (board.grid_key ^ board.bits.chips_key, board.score):
+			node = self.next_roots.get(tuple(card.index for card in board.market))
+			if node is not None:
+				return node
+		return SearchNode()
+
+	def search(self, board, rng):
+		start = time.perf_counter()
+		root = self.find_root(board)
+		self.reused_visits = root.visits
+		unseen = self.unseen_cards(board)
+		deadline = start + self.time_budget if self.time_budget is not None else None
+		playouts = 0
+		while True:
+			if self.playouts is not None and playouts >= self.playouts:
+				break
+			if deadline is not None and time.perf_counter() >= deadline:
+				break
+			rng.shuffle(unseen)
+			determinized = board.copy()
+			determinized.deck = Deck.from_order(tuple(unseen))
+			self.playout(root, determinized, rng)
+			playouts += 1
+
+		if root.children:
+			action = max(root.children.items(), key=lambda item: item[1].visits)[0]
+		else:
+			action = (legal_actions(board) or [CHURN_ACTION])[0]
+		self.last_root = root
+		self.last_playouts = playouts
+		self.last_elapsed = time.perf_counter() - start
+		self.total_playouts += playouts
+		self.total_elapsed += self.last_elapsed
+
+		# Keep the subtree of the chosen move, found again by the market
+		self.next_roots = None
+		chance = root.children.get(action)
+		if self.reuse and chance is not None:
+			after = board.copy()
+			after.make_move(action)
+			self.next_roots = chance.children
+			self.reuse_key = (after.grid_key ^ after.bits.chips_key, after.score)
+		return action
+
+	def playout(self, root, board, rng):
+		path = [root]
+		node = root
+		while len(board.deck) and board.bits.free:
+			if node.untried is None:
+				node.untried = legal_actions(board) or [CHURN_ACTION]
+				rng.shuffle(node.untried)
+			if node.untried:
+				action = node.untried.pop()
+				chance = SearchNode()
+				node.children[action] = chance
+			else:
+				action, chance = self.select_child(node)
+			board.make_move(action)
+			board.refill_market(True)
+			market = tuple(card.index for card in board.market)
+			child = chance.children.get(market)
+			expanded = child is None
+			if expanded:
+				child = SearchNode()
+				chance.children[market] = child
+			path.append(chance)
+			path.append(child)
+			node = child
+			if expanded:
+				break
+
+		score = self.finish(board, rng)
+		for node in path:
+			node.visits += 1
+			node.total += score
+
+	def select_child(self, node):
+		log_visits = math.log(node.visits)
+		best = None
+		best_value = None
+		for action, chance in node.children.items():
+			value = chance.total / chance.visits + self.exploration * math.sqrt(log_visits / chance.visits)
+			if best_value is None or value > best_value:
+				best = (action, chance)
+				best_value = value
+		return best
+
+	def finish(self, board, rng):
+		while len(board.deck) and board.bits.free:
+			if self.rollout == "greedy":
+				candidates = best_score_candidates(board, 25) or [CHURN_ACTION]
+				action = rng_choice(rng, candidates[-4:])
+			else:
+				action = rng_choice(rng, legal_actions(board) or [CHURN_ACTION])
+			board.make_move(action)
+			board.refill_market(True)
+		return board.quick_score()
+
+
+class ISMCTSBot(Agent):
+	def __init__(self, playouts=1000, time_budget=None, exploration=10.0, rollout="random", reuse=True, rng=None):
+		super().__init__(rng)
+		self.search = ISMCTSSearch(playouts, time_budget, exploration, rollout, reuse)
+
+	def select_move(self, game_state):
+		board = game_state.board
+		return Move.from_action(self.search.search(board, self.rng), board.actions)
+
+
+class ISMCTSGymBot(GymAgent):
+	def __init__(self, playouts=1000, time_budget=None, exploration=10.0, rollout="random", reuse=True, rng=None, verbose=False, variant=None):
+		super().__init__(rng, verbose, variant)
+		self.search = ISMCTSSearch(playouts, time_budget, exploration, rollout, reuse)
+
+	def select_move(self, board):
+		return Move.from_action(self.search.search(board, self.rng), board.actions)
@@ -0,0 +1,234 @@
+import numpy as np
+from aucteraden.actions import CHURN_ACTION, MARKET_SIZE, PAYMENT_OPTION_MASKS, PAYMENT_VECTORS
+from aucteraden.bitboard import SUIT_COUNT, geometry
+from aucteraden.board import Board
+from decktet.card import Card, CardType
+from decktet.deck import CARD_RANKS, CARD_SUIT_MASKS, Deck
+
+
+EMPTY = -1
+
+# length_score() as a lookup table, lengths of 7 and more score the same
+LENGTH_SCORES = np.array([0, -5, 2, 5, 9, 14, 20, 30], dtype=np.int32)
+
+
+class BatchedBoard:
+	# N games of one variant as NumPy arrays (struct of arrays). Cards are
+	# stored as Card.index values, EMPTY marks an empty cell or market slot.
+	# Every operation runs in lockstep over the whole batch and gives the
+	# same results as Board game for game.
+	def __init__(self, count, variant=None):
+		self.variant = variant if variant is not None else Board.standard_variant
+		self.count = count
+		self.cell_count = self.variant.cell_count
+		self.actions = self.variant.actions
+		neighbor_cells, _ = geometry(self.variant.col_count, self.variant.row_count)
+		# (cells, 4) neighbor table padded with the index of an extra empty cell
+		self.neighbors = np.full((self.cell_count, 4), self.cell_count, dtype=np.intp)
+		for cell, cells in enumerate(neighbor_cells):
+			self.neighbors[cell, :len(cells)] = cells
+
+		deck_size = len(self.variant.deck)
+		self.grid = np.full((count, self.cell_count), EMPTY, dtype=np.int16)
+		self.ranks = np.zeros((count, self.cell_count), dtype=np.int8)
+		self.suits = np.zeros((count, self.cell_count), dtype=np.uint8)
+		self.chips = np.full((count, SUIT_COUNT), self.variant.initial_chip_count, dtype=np.int16)
+		self.market = np.full((count, MARKET_SIZE), EMPTY, dtype=np.int16)
+		self.market_len = np.zeros(count, dtype=np.int8)
+		self.deck = np.zeros((count, deck_size), dtype=np.int16)
+		self.deck_len = np.zeros(count, dtype=np.int16)
+		self.top = np.zeros(count, dtype=np.int16)
+		self.score = np.zeros(count, dtype=np.int32)
+
+	def prepare(self, rngs):
+		# One rng per game, consumed exactly as Board.prepare does
+		for idx, rng in enumerate(rngs):
+			order = self.variant.deck.shuffled(rng).order
+			self.deck[idx, :len(order)] = order
+			self.deck_len[idx] = len(order)
+		self.top[:] = 0
+		self.chips[:] = self.variant.initial_chip_count
+		self.refill_market(False)
+
+	@classmethod
+	def from_boards(cls, boards):
+		batch = BatchedBoard(len(boards), boards[0].variant)
+		deck_size = max(len(board.deck.order) for board in boards)
+		batch.deck = np.zeros((len(boards), deck_size), dtype=np.int16)
+		for idx, board in enumerate(boards):
+			for cell, card in enumerate(board.grid):
+				if card is not None:
+					batch.grid[idx, cell] = card.index
+			batch.market_len[idx] = len(board.market)
+			for slot, card in enumerate(board.market):
+				batch.market[idx, slot] = card.index
+			batch.chips[idx] = board.bits.chips
+			batch.deck[idx, :len(board.deck.order)] = board.deck.order
+			batch.deck_len[idx] = len(board.deck.order)
+			batch.top[idx] = board.deck.top
+			batch.score[idx] = board.score
+		batch.update_cards()
+		return batch
+
+	def board(self, idx):
+		board = Board(self.variant)
+		for cell in np.flatnonzero(self.grid[idx] != EMPTY).tolist():
+			board.place_card_at(Card.registry[self.grid[idx, cell]], cell)
+		board.market = [Card.registry[card] for card in self.market[idx, :self.market_len[idx]].tolist()]
+		board.bits.set_chips(self.chips[idx].tolist())
+		board.deck = Deck.from_order(tuple(self.deck[idx, :self.deck_len[idx]].tolist()), int(self.top[idx]))
+		board.score = int(self.score[idx])
+		return board
+
+	def update_cards(self):
+		occupied = self.grid != EMPTY
+		self.ranks = np.where(occupied, CARD_RANKS[self.grid], 0).astype(np.int8)
+		self.suits = np.where(occupied, CARD_SUIT_MASKS[self.grid], 0).astype(np.uint8)
+
+	def deck_remaining(self):
+		return self.deck_len - self.top
+
+	def take_cards(self, rows):
+		# Deals the top card for the selected rows, EMPTY where a deck is empty
+		rows = rows & (self.top < self.deck_len)
+		index = np.minimum(self.top, self.deck.shape[1] - 1)
+		cards = np.where(rows, self.deck[np.arange(self.count), index], EMPTY).astype(np.int16)
+		self.top += rows
+		return rows, cards
+
+	def push_market(self, rows, cards):
+		# market.insert(0, card) for the selected rows
+		shifted = np.concatenate([cards[:, None], self.market[:, :-1]], axis=1)
+		self.market = np.where(rows[:, None], shifted, self.market)
+		self.market_len += rows
+
+	def refill_market(self, is_discard, active=None):
+		if active is None:
+			active = np.ones(self.count, dtype=np.bool_)
+		if is_discard:
+			dealt, cards = self.take_cards(active)
+			# Drop market cards sharing a suit with the discard card, keeping order
+			slots = np.arange(MARKET_SIZE)
+			filled = slots[None, :] < self.market_len[:, None]
+			card_masks = CARD_SUIT_MASKS[np.maximum(cards, 0)]
+			market_masks = CARD_SUIT_MASKS[np.maximum(self.market, 0)]
+			keep = filled & ((market_masks & card_masks[:, None]) == 0)
+			keep |= ~dealt[:, None] & filled
+			order = np.argsort(~keep, axis=1, kind="stable")
+			market = np.take_along_axis(self.market, order, axis=1)
+			kept = keep.sum(axis=1)
+			market = np.where(slots[None, :] < kept[:, None], market, EMPTY)
+			self.market = np.where(dealt[:, None], market, self.market).astype(np.int16)
+			self.market_len = np.where(dealt, kept, self.market_len).astype(np.int8)
+			self.push_market(dealt, cards)
+			filling = dealt
+		else:
+			filling = active
+		for _ in range(MARKET_SIZE):
+			filling = filling & (self.market_len < MARKET_SIZE)
+			dealt, cards = self.take_cards(filling)
+			self.push_market(dealt, cards)
+
+	def apply_actions(self, actions, active=None):
+		actions = np.asarray(actions)
+		if active is None:
+			active = np.ones(self.count, dtype=np.bool_)
+		rows = np.arange(self.count)
+		buy = self.actions.buy[actions]
+		churn = active & (buy < 0)
+		place = active & (buy >= 0)
+
+		self.market = np.where(churn[:, None], EMPTY, self.market).astype(np.int16)
+		self.market_len = np.where(churn, 0, self.market_len).astype(np.int8)
+		self.score -= 3 * churn
+
+		buy = np.maximum(buy, 0)
+		cards = self.market[rows, buy]
+		cells = np.maximum(self.actions.cell[actions], 0)
+		self.chips -= np.where(place[:, None], PAYMENT_VECTORS[np.maximum(self.actions.payment[actions], 0)], 0)
+		# market.pop(buy): move later slots one to the left
+		slots = np.arange(MARKET_SIZE)
+		source = np.minimum(slots[None, :] + (slots[None, :] >= buy[:, None]), MARKET_SIZE - 1)
+		market = np.take_along_axis(self.market, source, axis=1)
+		market[:, -1] = EMPTY
+		self.market = np.where(place[:, None], market, self.market).astype(np.int16)
+		self.market_len -= place
+
+		placed_rows = rows[place]
+		placed_cells = cells[place]
+		placed_cards = cards[place]
+		self.grid[placed_rows, placed_cells] = placed_cards
+		self.ranks[placed_rows, placed_cells] = CARD_RANKS[placed_cards]
+		self.suits[placed_rows, placed_cells] = CARD_SUIT_MASKS[placed_cards]
+
+	def legal_action_mask(self):
+		# (count, actions) boolean mask, row by row the same as
+		# legal_action_mask(board) of every game
+		occupied = self.grid != EMPTY
+		royal = occupied & ((self.ranks == CardType.ace) | (self.ranks == CardType.crowns))
+		pad = np.zeros((self.count, 1), dtype=np.bool_)
+		adjacent = np.concatenate([occupied, pad], axis=1)[:, self.neighbors].any(axis=2)
+		royal_adjacent = np.concatenate([royal, pad], axis=1)[:, self.neighbors].any(axis=2)
+		first = ~occupied.any(axis=1)
+
+		slots = np.arange(MARKET_SIZE)
+		filled = slots[None, :] < self.market_len[:, None]
+		cards = np.maximum(self.market, 0)
+		cost = np.clip(self.market_len[:, None] - slots[None, :] - 1, 0, MARKET_SIZE - 1)
+		affordable = (PAYMENT_VECTORS[None, :, :] <= self.chips[:, None, :]).all(axis=2)
+		payments = PAYMENT_OPTION_MASKS[cards, cost] & affordable[:, None, :] & filled[:, :, None]
+
+		card_ranks = CARD_RANKS[cards]
+		card_royal = (card_ranks == CardType.ace) | (card_ranks == CardType.crowns)
+		reachable = adjacent[:, None, :] & ~(card_royal[:, :, None] & royal_adjacent[:, None, :])
+		cells = ~occupied[:, None, :] & (first[:, None, None] | reachable)
+
+		mask = np.zeros((self.count, self.actions.count), dtype=np.bool_)
+		mask[:, CHURN_ACTION] = True
+		mask[:, 1:] = (payments[:, :, :, None] & cells[:, :, None, :]).reshape(self.count, -1)
+		return mask
+
+	def is_over(self):
+		return (self.top >= self.deck_len) | (self.grid != EMPTY).all(axis=1)
+
+	def chain_scores(self):
+		# Longest ascending chain per (game, suit), found by relaxing chain
+		# lengths over the neighbor table until nothing changes
+		count, cells = self.grid.shape
+		suit_bits = (1 << np.arange(SUIT_COUNT, dtype=np.uint8))
+		present = (self.suits[:, None, :] & suit_bits[None, :, None]) != 0
+		ranks = np.broadcast_to(self.ranks[:, None, :], present.shape).astype(np.int16)
+		pad = np.zeros(present.shape[:2] + (1,), dtype=present.dtype)
+		present_pad = np.concatenate([present, pad], axis=2)
+		ranks_pad = np.concatenate([ranks, np.zeros(pad.shape, dtype=ranks.dtype)], axis=2)
+		successor = present[..., None] & present_pad[..., self.neighbors] & (ranks_pad[..., self.neighbors] > ranks[..., None])
+
+		crowns = present & (ranks == CardType.crowns)
+		longest = present.astype(np.int16)
+		crowned = crowns.astype(np.int16)
+		zero = np.zeros(pad.shape, dtype=np.int16)
+		for _ in range(cells):
+			longest_next = np.concatenate([longest, zero], axis=2)[..., self.neighbors]
+			crowned_next = np.concatenate([crowned, zero], axis=2)[..., self.neighbors]
+			new_longest = np.where(present, 1 + np.where(successor, longest_next, 0).max(axis=3), 0)
+			best_crowned = np.where(successor, crowned_next, 0).max(axis=3)
+			new_crowned = np.where(crowns, 1, np.where(present & (best_crowned > 0), best_crowned + 1, 0))
+			if (new_longest == longest).all() and (new_crowned == crowned).all():
+				break
+			longest, crowned = new_longest, new_crowned
+
+		first_ace = ranks == CardType.ace
+		plain = LENGTH_SCORES[np.minimum(longest, 7)] + first_ace * 1
+		with_crown = LENGTH_SCORES[np.minimum(crowned, 7)] + np.where(first_ace, 4, 2)
+		start = np.where(crowned > 0, np.maximum(plain, with_crown), plain)
+		start = np.where(present, start, np.iinfo(np.int32).min)
+		return np.where(present.any(axis=2), start.max(axis=2), 0)
+
+	def penalties(self):
+		initial = self.variant.initial_chip_count
+		chips = -5 * ((self.chips == 0) | (self.chips == initial)).sum(axis=1)
+		empty = -5 * (self.grid == EMPTY).sum(axis=1)
+		return chips + empty
+
+	def calculate_score(self):
+		return self.score + self.penalties() + self.chain_scores().sum(axis=1)
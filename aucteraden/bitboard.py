@@ -0,0 +1,299 @@
+import copy
+from aucteraden.zobrist import CHIP_KEYS, CHIP_LEVELS, chips_key
+from decktet.card import CardType
+
+
+SUIT_COUNT = 6
+
+# Neighbor order matches board.directions: up, down, left, right
+_directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+
+_geometry_cache = {}
+
+
+def geometry(col_count, row_count):
+	key = (col_count, row_count)
+	if key not in _geometry_cache:
+		neighbor_cells = []
+		neighbor_masks = []
+		for row in range(row_count):
+			for col in range(col_count):
+				cells = []
+				mask = 0
+				for dr, dc in _directions:
+					nr, nc = row + dr, col + dc
+					if 0 <= nr < row_count and 0 <= nc < col_count:
+						cell = nc + nr * col_count
+						cells.append(cell)
+						mask |= 1 << cell
+				neighbor_cells.append(tuple(cells))
+				neighbor_masks.append(mask)
+		_geometry_cache[key] = (tuple(neighbor_cells), tuple(neighbor_masks))
+	return _geometry_cache[key]
+
+
+def iter_bits(mask):
+	while mask:
+		low = mask & -mask
+		yield low.bit_length() - 1
+		mask ^= low
+
+
+def is_royal(rank):
+	return rank == CardType.ace or rank == CardType.crowns
+
+
+def length_score(length):
+	if length >= 7:
+		return 30
+	elif length == 6:
+		return 20
+	elif length == 5:
+		return 14
+	elif length == 4:
+		return 9
+	elif length == 3:
+		return 5
+	elif length == 2:
+		return 2
+	return -5
+
+
+def chain_score(length, first_ace, last_crowns):
+	score = 0
+	if first_ace and last_crowns:
+		score = 4
+	elif first_ace:
+		score = 1
+	elif last_crowns:
+		score = 2
+	return score + length_score(length)
+
+
+class BitBoard:
+	def __init__(self, col_count, row_count, initial_chip_count):
+		self.col_count = col_count
+		self.row_count = row_count
+		self.cell_count = col_count * row_count
+		self.full_mask = (1 << self.cell_count) - 1
+		self.initial_chip_count = initial_chip_count
+		self.neighbor_cells, self.neighbor_masks = geometry(col_count, row_count)
+		self.ranks = [0] * self.cell_count
+		self.suit_masks = [0] * SUIT_COUNT
+		self.occupied = 0
+		self.royal = 0
+		# Cells next to any occupied cell, and next to an ace or crown
+		self.adjacent = 0
+		self.royal_adjacent = 0
+		# Score caches, kept current by place(), pay() and set_chips()
+		self.suit_scores = [0] * SUIT_COUNT
+		self.chain_total = 0
+		self.empty_penalty = -5 * self.cell_count
+		self.set_chips([initial_chip_count] * SUIT_COUNT)
+
+	@property
+	def free(self):
+		return self.full_mask & ~self.occupied
+
+	def set_chips(self, chips):
+		self.chips = list(chips)
+		self.chips_key = chips_key(self.chips)
+		self.chip_penalty = 0
+		for count in self.chips:
+			self.chip_penalty += self.chip_count_penalty(count)
+
+	def chip_count_penalty(self, count):
+		if count == 0 or count == self.initial_chip_count:
+			return -5
+		return 0
+
+	def place(self, cell, rank, suit_mask):
+		bit = 1 << cell
+		self.ranks[cell] = rank
+		if not self.occupied & bit:
+			self.empty_penalty += 5
+		self.occupied |= bit
+		self.adjacent |= self.neighbor_masks[cell]
+		if is_royal(rank):
+			self.royal |= bit
+			self.royal_adjacent |= self.neighbor_masks[cell]
+		for suit in iter_bits(suit_mask):
+			self.suit_masks[suit] |= bit
+			self.update_suit_score(suit)
+
+	def remove(self, cell, suit_mask):
+		bit = 1 << cell
+		self.ranks[cell] = 0
+		self.occupied &= ~bit
+		self.royal &= ~bit
+		for suit in iter_bits(suit_mask):
+			self.suit_masks[suit] &= ~bit
+		self.adjacent = self.neighborhood(self.occupied)
+		self.royal_adjacent = self.neighborhood(self.royal)
+
+	def neighborhood(self, mask):
+		result = 0
+		for cell in iter_bits(mask):
+			result |= self.neighbor_masks[cell]
+		return result
+
+	def save_scores(self):
+		return list(self.chips), self.chips_key, self.chip_penalty, list(self.suit_scores), self.chain_total, self.empty_penalty
+
+	def restore_scores(self, saved):
+		chips, self.chips_key, self.chip_penalty, suit_scores, self.chain_total, self.empty_penalty = saved
+		self.chips = list(chips)
+		self.suit_scores = list(suit_scores)
+
+	def copy(self):
+		bits = copy.copy(self)
+		bits.ranks = list(self.ranks)
+		bits.suit_masks = list(self.suit_masks)
+		bits.chips = list(self.chips)
+		bits.suit_scores = list(self.suit_scores)
+		return bits
+
+	def update_suit_score(self, suit):
+		_, score = self.longest_chain(suit, False)
+		self.chain_total += score - self.suit_scores[suit]
+		self.suit_scores[suit] = score
+
+	def chain_total_if_placed(self, cell, rank, suit_mask):
+		# Only the suits of the placed card can change their chains
+		bit = 1 << cell
+		old_rank = self.ranks[cell]
+		self.ranks[cell] = rank
+		total = self.chain_total
+		for suit in iter_bits(suit_mask):
+			old_mask = self.suit_masks[suit]
+			self.suit_masks[suit] = old_mask | bit
+			total += self.longest_chain(suit, False)[1] - self.suit_scores[suit]
+			self.suit_masks[suit] = old_mask
+		self.ranks[cell] = old_rank
+		return total
+
+	def penalty_if_placed(self, cell, payment=()):
+		penalty = self.empty_penalty + self.chip_penalty_after(payment)
+		if not self.occupied >> cell & 1:
+			penalty += 5
+		return penalty
+
+	def score_if_placed(self, cell, rank, suit_mask, payment=()):
+		return self.chain_total_if_placed(cell, rank, suit_mask) + self.penalty_if_placed(cell, payment)
+
+	def chip_penalty_after(self, payment):
+		penalty = self.chip_penalty
+		for suit, count in payment:
+			if count:
+				chips = self.chips[suit]
+				penalty += self.chip_count_penalty(chips - count) - self.chip_count_penalty(chips)
+		return penalty
+
+	def legal_placements(self, rank):
+		if self.occupied == 0:
+			return self.full_mask
+		mask = self.adjacent & ~self.occupied
+		if is_royal(rank):
+			mask &= ~self.royal_adjacent
+		return mask
+
+	def is_valid_placement(self, cell, rank):
+		return self.legal_placements(rank) >> cell & 1 == 1
+
+	def pay(self, payment):
+		for suit, count in payment:
+			chips = self.chips[suit]
+			self.chip_penalty += self.chip_count_penalty(chips - count) - self.chip_count_penalty(chips)
+			self.chips_key ^= CHIP_KEYS[suit][chips % CHIP_LEVELS] ^ CHIP_KEYS[suit][(chips - count) % CHIP_LEVELS]
+			self.chips[suit] = chips - count
+
+	def can_pay(self, payment):
+		for suit, count in payment:
+			if self.chips[suit] < count:
+				return False
+		return True
+
+	def penalty(self):
+		return self.chip_penalty + self.empty_penalty
+
+	def longest_chain(self, suit, trace=True):
+		# Ascending-rank chains form a DAG, so longest paths are computed once
+		# per cell in descending rank order. For every cell we keep the longest
+		# chain starting there and the longest one that ends on a crown, since
+		# the crown bonus can outweigh a single extra card.
+		mask = self.suit_masks[suit]
+		if mask == 0:
+			return None, None
+		ranks = self.ranks
+		neighbor_cells = self.neighbor_cells
+		longest = [0] * self.cell_count
+		crowned = [0] * self.cell_count
+		if trace:
+			next_long = [-1] * self.cell_count
+			next_crown = [-1] * self.cell_count
+		best_score = None
+		best_start = -1
+		best_crowned = False
+		for cell in sorted(iter_bits(mask), key=ranks.__getitem__, reverse=True):
+			rank = ranks[cell]
+			length = 0
+			crown_length = 0
+			for ncell in neighbor_cells[cell]:
+				if mask >> ncell & 1 and ranks[ncell] > rank:
+					if longest[ncell] > length:
+						length = longest[ncell]
+						if trace:
+							next_long[cell] = ncell
+					if crowned[ncell] > crown_length:
+						crown_length = crowned[ncell]
+						if trace:
+							next_crown[cell] = ncell
+			longest[cell] = length + 1
+			if rank == CardType.crowns:
+				crowned[cell] = 1
+			elif crown_length:
+				crowned[cell] = crown_length + 1
+
+		for cell in iter_bits(mask):
+			first_ace = ranks[cell] == CardType.ace
+			score = chain_score(longest[cell], first_ace, False)
+			is_crowned = False
+			if crowned[cell]:
+				crown_score = chain_score(crowned[cell], first_ace, True)
+				if crown_score >= score:
+					score = crown_score
+					is_crowned = True
+			if best_score is None or score > best_score:
+				best_score = score
+				best_start = cell
+				best_crowned = is_crowned
+
+		if not trace:
+			return None, best_score
+		chain = []
+		nexts = next_crown if best_crowned else next_long
+		cell = best_start
+		while cell >= 0:
+			chain.append(cell)
+			cell = nexts[cell]
+		return chain, best_score
+
+	def chain_scores(self):
+		return list(self.suit_scores)
+
+	def longest_chains(self):
+		result = {}
+		for suit in range(SUIT_COUNT):
+			if self.suit_masks[suit]:
+				result[suit] = self.longest_chain(suit)
+		return result
+
+	def calculate_score(self):
+		score = self.penalty()
+		longest_chains = self.longest_chains()
+		for _, ch_score in longest_chains.values():
+			score += ch_score
+		return score, longest_chains
+
+	def quick_score(self):
+		return self.chip_penalty + self.empty_penalty + self.chain_total
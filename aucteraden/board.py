@@ -1,5 +1,9 @@
 import copy
-import random
+import types
+import numpy as np
+from aucteraden.actions import CHURN_ACTION, PAYMENTS, action_space, legal_action_mask, payment_index, payment_options
+from aucteraden.bitboard import BitBoard, chain_score, iter_bits
+from aucteraden.zobrist import CELL_KEYS, DECK_KEYS, market_key
 from decktet.card import Card, CardSuit, CardType
 from decktet.deck import Deck
 
@@ -7,45 +11,86 @@ from decktet.deck import Deck
 # Define directions for neighbors (up, down, left, right)
 directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
 
+# Shared payment dicts for moves built from actions, read-only proxies so
+# that a move cannot change the payment of every other move
+payment_dicts = tuple(types.MappingProxyType({CardSuit(suit): count for suit, count in payment}) for payment in PAYMENTS)
+
+
+class Variant:
+	# Per-game configuration: grid size, starting chips per suit and deck
+	def __init__(self, col_count=4, row_count=4, initial_chip_count=4, deck=None):
+		self.col_count = col_count
+		self.row_count = row_count
+		self.cell_count = col_count * row_count
+		self.initial_chip_count = initial_chip_count
+		self.deck = deck if deck is not None else Deck.make_standard()
+		self.actions = action_space(col_count, row_count)
+
+	@classmethod
+	def extended(cls, col_count=4, row_count=4, initial_chip_count=4):
+		return Variant(col_count, row_count, initial_chip_count, Deck.make_extended())
+
+	def __str__(self):
+		return "%dx%d, %d chips, %d cards" % (self.col_count, self.row_count, self.initial_chip_count, len(self.deck))
+
 
 class Board:
+	# Defaults of the standard game; a board's own geometry comes from its variant
 	initial_chip_count = 4
 	col_count = 4
 	row_count = 4
-	standard_deck = Deck.make_standard()
-
-	def __init__(self):
-		self.grid = []
-		self.free_cells = set()
-		for row in range(Board.row_count):
-			for col in range(Board.col_count):
-				self.grid.append(None)
-				self.free_cells.add((col, row))
-		self.grid_empty = True
+	standard_variant = Variant(col_count, row_count, initial_chip_count)
+	standard_deck = standard_variant.deck
+	actions = standard_variant.actions
+
+	def __init__(self, variant=None):
+		self.variant = variant if variant is not None else Board.standard_variant
+		self.col_count = self.variant.col_count
+		self.row_count = self.variant.row_count
+		self.initial_chip_count = self.variant.initial_chip_count
+		self.actions = self.variant.actions
+		self.bits = BitBoard(self.col_count, self.row_count, self.initial_chip_count)
+		self.grid = [None] * self.bits.cell_count
+		self.grid_key = 0
 		self.score = 0
 		self.market = []
-		self.chips = {}
 		self.deck = Deck([])
 
-	def prepare(self):
-		self.deck = copy.deepcopy(Board.standard_deck)
-		random.shuffle(self.deck.cards)
-		self.chips = {
-			CardSuit.moons:  Board.initial_chip_count,
-			CardSuit.suns:   Board.initial_chip_count,
-			CardSuit.waves:  Board.initial_chip_count,
-			CardSuit.leaves: Board.initial_chip_count,
-			CardSuit.wyrms:  Board.initial_chip_count,
-			CardSuit.knots:  Board.initial_chip_count
-		}
+	@property
+	def grid_empty(self):
+		return self.bits.occupied == 0
+
+	@property
+	def key(self):
+		# Zobrist key of the grid, market, chips and deck cursor
+		return self.grid_key ^ market_key(self.market) ^ self.bits.chips_key ^ DECK_KEYS[self.deck.top]
+
+	@property
+	def free_cells(self):
+		# Ascending cell order. Before the bitboard this was a set of (col, row)
+		# in hash order, which the bots scanned; seeded games and label data
+		# generated with that order are not reproduced.
+		return [(cell % self.col_count, cell // self.col_count) for cell in iter_bits(self.bits.free)]
+
+	@property
+	def chips(self):
+		return dict(zip(CardSuit, self.bits.chips))
+
+	@chips.setter
+	def chips(self, chips):
+		self.bits.set_chips([chips[suit] for suit in CardSuit])
+
+	def prepare(self, rng=None):
+		self.deck = self.variant.deck.shuffled(rng)
+		self.bits.set_chips([self.initial_chip_count] * len(CardSuit))
 		self.refill_market(False)
 		
 	def get_card(self, col, row):
-		if col < 0 or col >= Board.col_count:
+		if col < 0 or col >= self.col_count:
 			return None
-		if row < 0 or row >= Board.row_count:
+		if row < 0 or row >= self.row_count:
 			return None
-		return self.grid[col + row * Board.col_count]
+		return self.grid[col + row * self.col_count]
 
 	def str_card(self, card):
 		if card is None:
@@ -53,16 +98,15 @@ class Board:
 		return f"{card}  "
 
 	def __str__(self):
-		s = "Deck: %d      Chips: " % len(self.deck.cards)
+		s = "Deck: %d      Chips: " % len(self.deck)
 		for suit, count in self.chips.items():
 			s += "%s:%d  " % (Card.suit_map[suit], count)
 		s += "\n\n    "
 		s += str()
 		s += self.str_market() + "\n"
-		for row in range(Board.row_count):
-			for col in range(Board.col_count):
+		for row in range(self.row_count):
+			for col in range(self.col_count):
 				card = self.get_card(col, row)
-				#card = self.deck.cards[row * Board.col_count + col]
 				s += self.str_card(card)
 			s += "\n\n"
 		return s
@@ -81,10 +125,10 @@ class Board:
 				return
 			#print("Card for discards: " + str(card) + ", market:")
 			#self.print_market()
-			self.market = [x for x in self.market if not bool(x.suits & card.suits)]
+			self.market = [x for x in self.market if not x.mask & card.mask]
 			self.market.insert(0, card)
 		while len(self.market) < 3:
-			if len(self.deck.cards) > 0:
+			if len(self.deck) > 0:
 				card = self.deck.take_card()
 				if card is None:
 					return
@@ -94,159 +138,196 @@ class Board:
 
 	def buy_card(self, idx, payment):
 		card = self.market.pop(idx)
-		for suit, count in payment.items():
-			self.chips[suit] -= count
+		self.bits.pay([(suit.value, count) for suit, count in payment.items()])
 		return card
 
 	def place_card(self, card, col, row):
-		idx = col + row * Board.col_count
-		self.grid[idx] = card
-		self.free_cells.remove((col, row))
-		self.grid_empty = False
+		self.place_card_at(card, col + row * self.col_count)
+
+	def place_card_at(self, card, cell):
+		self.grid[cell] = card
+		self.grid_key ^= CELL_KEYS[cell][card.index]
+		self.bits.place(cell, card.type, card.mask)
 
 	def chain_score(self, chain):
-		score = 0
 		first_ace = chain[0][0].type == CardType.ace
 		last_crowns = chain[-1][0].type == CardType.crowns
-		if first_ace and last_crowns:
-			score = 4
-		elif first_ace:
-			score = 1
-		elif last_crowns:
-			score = 2
-
-		l = len(chain)
-		if l >=7:
-			score += 30
-		elif l == 6:
-			score += 20
-		elif l == 5:
-			score += 14
-		elif l == 4:
-			score += 9
-		elif l == 3:
-			score += 5
-		elif l == 2:
-			score += 2
-		else:
-			score += -5
-		return score
+		return chain_score(len(chain), first_ace, last_crowns)
 
 	def find_longest_chains_by_suit(self):
-		rows, cols = Board.row_count, Board.col_count
 		longest_chains_by_suit = {}
-
-		# DFS function to explore chains
-		def dfs(suit, r, c, chain):
-			#print(f"dfs enter {r}, {c} suit {suit}: {chain}")
-			card = self.get_card(c, r)
-			if card is None or suit not in card.suits:
-				return
-			current_num = card.type
-			chain.append((card, c, r))  # Add current card to the chain
-			#print(f"append {suit} - {r}, {c}: {chain}")
-			dead_end = True
-			# Explore all four possible neighbors
-			for dr, dc in directions:
-				nr, nc = r + dr, c + dc
-				if 0 <= nr < rows and 0 <= nc < cols:
-					ncard = self.get_card(nc, nr)
-					if ncard is not None:
-						neighbor_num = ncard.type
-						# Check for ascending order and same suit
-						if suit in ncard.suits and neighbor_num > current_num:
-							#print(f"suit {suit}: descend from {r}, {c} to {nr}, {nc}: {neighbor_num} > {current_num}")
-							dfs(suit, nr, nc, chain)
-							dead_end = False
-			if dead_end and len(chain) > 0:
-				chains.append(copy.deepcopy(chain))
-				#print(f"Chain added: {chain}")
-
-			# Backtrack: remove the current cell from the path
-			chain.pop()
-
-		for suit in CardSuit:
-			max_score = -10000000
-			chains = []
-			#print(f"===== Scan for suit {suit} =====\n")
-			# Iterate over each cell in the board
-			for r in range(rows):
-				for c in range(cols):
-					# Start a new chain from each cell
-					dfs(suit, r, c, [])
-					for chain in chains:
-						#print(f"dfs returned {chain}")
-
-						# Update longest chain for the suit if this chain is longer
-						ch_score = self.chain_score(chain)
-						if suit not in longest_chains_by_suit or ch_score > max_score:
-							max_score = ch_score
-							#print(f"new longest chain for suit {suit}: {list(map(str, chain))}, score: {ch_score}\n")
-							longest_chains_by_suit[suit] = (chain, ch_score)
+		for suit, (cells, ch_score) in self.bits.longest_chains().items():
+			chain = [(self.grid[cell], cell % self.col_count, cell // self.col_count) for cell in cells]
+			longest_chains_by_suit[CardSuit(suit)] = (chain, ch_score)
 		return longest_chains_by_suit
 
 	def calculate_score(self):
-		score = self.score
-		for suit, count in self.chips.items():
-			if count == 0 or count == Board.initial_chip_count:
-				score -= 5
-		for card in self.grid:
-			if card is None:
-				score -= 5
-
+		score = self.score + self.bits.penalty()
 		longest_chains = self.find_longest_chains_by_suit()
 		for suit, (chain, ch_score) in longest_chains.items():
-			#print(f"Longest chain for suit {suit}: {list(map(str, chain))}, score: {ch_score}")
 			score += ch_score
-
 		return score, longest_chains
 
+	def quick_score(self):
+		return self.score + self.bits.quick_score()
+
+	def score_if_placed(self, card, col, row, payment=None, table=None):
+		cell = col + row * self.col_count
+		payment = [(suit.value, count) for suit, count in payment.items()] if payment else ()
+		return self.score + self.chain_total_if_placed(card, cell, table) + self.bits.penalty_if_placed(cell, payment)
+
+	def chain_total_if_placed(self, card, cell, table=None):
+		# With a transposition table, chain scores are memoized by the
+		# Zobrist key of the resulting grid
+		if table is None:
+			return self.bits.chain_total_if_placed(cell, card.type, card.mask)
+		key = self.grid_key ^ CELL_KEYS[cell][card.index]
+		chain_total = table.get(key)
+		if chain_total is None:
+			chain_total = self.bits.chain_total_if_placed(cell, card.type, card.mask)
+			table.put(key, chain_total)
+		return chain_total
+
+	def score_moves(self, moves, table=None):
+		# Score after each move (Move or integer action) without making it.
+		# Only the chains of the placed card's suits are recomputed, once per
+		# card and cell, and payments only change the chip penalty.
+		scores = np.empty(len(moves), dtype=np.int32)
+		chain_totals = {}
+		for i, move in enumerate(moves):
+			if isinstance(move, Move):
+				move = move.to_action(self.actions)
+			buy, payment, cell = self.actions.table[move]
+			if buy is None:
+				scores[i] = self.score - 3 + self.bits.quick_score()
+				continue
+			card = self.market[buy]
+			key = (card.index, cell)
+			chain_total = chain_totals.get(key)
+			if chain_total is None:
+				chain_total = self.chain_total_if_placed(card, cell, table)
+				chain_totals[key] = chain_total
+			scores[i] = self.score + chain_total + self.bits.penalty_if_placed(cell, PAYMENTS[payment])
+		return scores
+
 	def is_valid_move(self, move, check_payment):
+		if not isinstance(move, Move):
+			return self.is_legal_action(move)
+
 		if move.churn_market:
 			return True
 
 		if check_payment and not self.is_valid_payment(move.payment):
 			return False
 
-		if self.get_card(move.col, move.row) is not None:
-			return False
-
 		mcard = self.market[move.buy_card_index]
-		if not self.grid_empty:
-			has_neighbour = False
-			for dr, dc in directions:
-				gcard = self.get_card(move.col + dc, move.row + dr)
-				if gcard is not None:
-					if (mcard.type == CardType.ace or mcard.type == CardType.crowns) and (gcard.type == CardType.ace or gcard.type == CardType.crowns):
-						return False
-					has_neighbour = True
-			return has_neighbour
-
-		return True
+		return self.bits.is_valid_placement(move.col + move.row * self.col_count, mcard.type)
 	
+	def legal_placements(self, card):
+		return self.bits.legal_placements(card.type)
+
+	def legal_cells(self, card):
+		return [(cell % self.col_count, cell // self.col_count) for cell in iter_bits(self.bits.legal_placements(card.type))]
+
+	def is_legal_action(self, action):
+		buy, payment, cell = self.actions.table[action]
+		if buy is None:
+			return True
+		if buy >= len(self.market):
+			return False
+		card = self.market[buy]
+		cost = len(self.market) - buy - 1
+		if payment not in payment_options(card, cost):
+			return False
+		if not self.bits.can_pay(PAYMENTS[payment]):
+			return False
+		return self.bits.is_valid_placement(cell, card.type)
+
+	def legal_action_mask(self):
+		return legal_action_mask(self)
+
 	def is_valid_payment(self, payment):
-		for suit, count in payment.items():
-			if self.chips[suit] < count:
-				return False
-		return True
+		return self.bits.can_pay([(suit.value, count) for suit, count in payment.items()])
+
+	def copy(self):
+		# Cards and the deck's card tuple are shared, only mutable state is copied
+		board = copy.copy(self)
+		board.bits = self.bits.copy()
+		board.grid = list(self.grid)
+		board.market = list(self.market)
+		board.deck = self.deck.copy()
+		return board
+
+	def snapshot(self):
+		# Compact position: card indexes (+1, 0 for none) of the grid and the
+		# market, chips, score and deck cursor packed into bytes. The deck
+		# permutation is shared, not copied.
+		data = bytearray(card.index + 1 if card else 0 for card in self.grid)
+		market = [card.index + 1 for card in self.market]
+		data += bytes(market + [0] * (3 - len(market)))
+		data += bytes(self.bits.chips)
+		data += self.score.to_bytes(2, "little", signed=True)
+		data += self.deck.top.to_bytes(2, "little")
+		return bytes(data), self.deck.order
 
-	def apply_move(self, move):
-		card = None
-		next_board = copy.deepcopy(self)
-		if move.buy_card_index is not None:
-			card = next_board.buy_card(move.buy_card_index, move.payment)
-		if move.churn_market:
-			next_board.market = []
-			next_board.score -= 3
+	@classmethod
+	def from_snapshot(cls, snapshot, variant=None):
+		data, order = snapshot
+		board = Board(variant)
+		cell_count = board.bits.cell_count
+		for cell in range(cell_count):
+			if data[cell]:
+				board.place_card_at(Card.registry[data[cell] - 1], cell)
+		board.market = [Card.registry[idx - 1] for idx in data[cell_count:cell_count + 3] if idx]
+		offset = cell_count + 3
+		board.bits.set_chips(data[offset:offset + 6])
+		board.score = int.from_bytes(data[offset + 6:offset + 8], "little", signed=True)
+		board.deck = Deck.from_order(order, int.from_bytes(data[offset + 8:offset + 10], "little"))
+		return board
+
+	def make_move(self, move):
+		# Accepts a Move or an integer action; returns the undo record
+		if isinstance(move, Move):
+			if move.churn_market:
+				return self.make_action(None, None, None)
+			payment = [(suit.value, count) for suit, count in move.payment.items()]
+			return self.make_action(move.buy_card_index, payment, move.col + move.row * self.col_count)
+		buy, payment, cell = self.actions.table[move]
+		return self.make_action(buy, PAYMENTS[payment] if buy is not None else None, cell)
+
+	def make_action(self, buy, payment, cell):
+		undo = (self.market, self.score, self.bits.save_scores(), cell)
+		if cell is None:
+			self.market = []
+			self.score -= 3
 		else:
-			next_board.place_card(card, move.col, move.row)
+			self.market = list(self.market)
+			card = self.market.pop(buy)
+			self.bits.pay(payment)
+			self.place_card_at(card, cell)
+		return undo
+
+	def unmake_move(self, move, undo):
+		self.market, self.score, saved, cell = undo
+		if cell is not None:
+			card = self.grid[cell]
+			self.grid[cell] = None
+			self.grid_key ^= CELL_KEYS[cell][card.index]
+			self.bits.remove(cell, card.mask)
+		self.bits.restore_scores(saved)
+
+	def apply_move(self, move):
+		next_board = self.copy()
+		next_board.make_move(move)
 		return next_board
 
 class Move:
-	def __init__(self, buy_card_index=None, payment={}, col=None, row=None, churn_market=False):
+	__slots__ = ("buy_card_index", "payment", "col", "row", "churn_market")
+
+	def __init__(self, buy_card_index=None, payment=None, col=None, row=None, churn_market=False):
 		#assert (buy_card_index is None) ^ (len(payment) == (2 - buy_card_index))
 		self.buy_card_index = buy_card_index
-		self.payment = payment
+		self.payment = payment if payment is not None else {}
 		self.col = col
 		self.row = row
 		self.churn_market = churn_market
@@ -258,6 +339,20 @@ class Move:
 	@classmethod
 	def churn(cls):
 		return Move(None, {}, None, None, True)
+
+	@classmethod
+	def from_action(cls, action, actions=None):
+		buy, payment, cell = (actions or Board.actions).table[action]
+		if buy is None:
+			return Move.churn()
+		col_count = (actions or Board.actions).col_count
+		return Move(buy, payment_dicts[payment], cell % col_count, cell // col_count, False)
+
+	def to_action(self, actions=None):
+		actions = actions or Board.actions
+		if self.churn_market:
+			return CHURN_ACTION
+		return actions.encode(self.buy_card_index, payment_index(self.payment), self.col + self.row * actions.col_count)
 	
 	def __str__(self):
 		result = ""
@@ -277,21 +372,80 @@ class Move:
 		return result
 
 
+class MoveLog:
+	# Persistent list of (position before the move, move) entries. States
+	# branching from the same parent share the entries before them.
+	__slots__ = ("parent", "snapshot", "move", "ply")
+
+	def __init__(self, parent, snapshot, move):
+		self.parent = parent
+		self.snapshot = snapshot
+		self.move = move
+		self.ply = parent.ply + 1 if parent is not None else 0
+
+
 class GameState:
-	def __init__(self, board, previous, move):
+	def __init__(self, board, previous, move, keep_states=None, log=None):
 		self.board = board
 		self.previous_state = previous
 		self.last_move = move
+		# None keeps every previous state alive. An integer keeps only that
+		# many previous states and records older positions in a MoveLog.
+		self.keep_states = keep_states
+		self.log = log
 
 	@classmethod
-	def new_game(cls):
-		board = Board()
-		board.prepare()
-		return GameState(board, None, None)
+	def new_game(cls, keep_states=None, rng=None, variant=None):
+		board = Board(variant)
+		board.prepare(rng)
+		return GameState(board, None, None, keep_states)
+
+	@property
+	def ply(self):
+		if self.keep_states is None:
+			ply = 0
+			state = self.previous_state
+			while state is not None:
+				ply += 1
+				state = state.previous_state
+			return ply
+		return self.log.ply + 1 if self.log is not None else 0
 
 	def apply_move(self, move):
-		return GameState(self.board.apply_move(move), self, move)
-	
-	def is_over(self):
-		return len(self.board.deck.cards) == 0 or len(self.board.free_cells) == 0
+		board = self.board.apply_move(move)
+		if self.keep_states is None:
+			return GameState(board, self, move)
+
+		log = MoveLog(self.log, self.board.snapshot(), move)
+		previous = self if self.keep_states > 0 else None
+		next_state = GameState(board, previous, move, self.keep_states, log)
+		# Unlink the state that just fell out of the window
+		state = next_state
+		for _ in range(self.keep_states):
+			if state.previous_state is None:
+				break
+			state = state.previous_state
+		state.previous_state = None
+		return next_state
+
+	def state_at(self, ply):
+		# Rebuilds the position after the first `ply` moves of this game
+		current = self.ply
+		if ply < 0 or ply > current:
+			raise IndexError(f"ply {ply} is out of range 0..{current}")
+		state = self
+		while current > ply and state.previous_state is not None:
+			state = state.previous_state
+			current -= 1
+		if current == ply:
+			return state
+
+		entry = self.log
+		while entry.ply > ply:
+			entry = entry.parent
+		board = Board.from_snapshot(entry.snapshot, self.board.variant)
+		move = entry.parent.move if entry.parent is not None else None
+		return GameState(board, None, move, self.keep_states, entry.parent)
 
+	def is_over(self):
+		return len(self.board.deck) == 0 or self.board.bits.free == 0
@@ -0,0 +1,48 @@
+from aucteraden.actions import MARKET_SIZE
+from aucteraden.zobrist import UNSEEN_KEYS, market_key
+from decktet.card import Card
+
+
+# Chance nodes of the expectimax searches (ExpectimaxBot, EndgameSolver):
+# the cards still to come are known as a set, never in their order.
+
+
+def unseen_cards(board):
+	# The cards left in the deck and their Zobrist key
+	unseen = list(board.deck.order[board.deck.top:])
+	unseen_key = 0
+	for idx in unseen:
+		unseen_key ^= UNSEEN_KEYS[idx]
+	return unseen, unseen_key
+
+
+def position_key(board, unseen_key):
+	# Grid, market, chips and unseen cards. The score is left out: values
+	# are stored relative to board.score, without the churn penalties taken
+	# so far.
+	return board.grid_key ^ market_key(board.market) ^ board.bits.chips_key ^ unseen_key
+
+
+def draw_average(board, unseen, unseen_key, positions, is_discard, value, stopped):
+	# Average of value(board, unseen, unseen_key, short) over dealing each
+	# unseen[pos], mirroring Board.refill_market: a card dealt for discards
+	# drops the market cards sharing a suit with it, and short tells that
+	# the market needs another card. Board and unseen are restored; the
+	# average stops early once stopped() is true.
+	market = board.market
+	total = 0
+	for pos in positions:
+		unseen[pos], unseen[-1] = unseen[-1], unseen[pos]
+		idx = unseen.pop()
+		card = Card.registry[idx]
+		if is_discard:
+			board.market = [card] + [x for x in market if not x.mask & card.mask]
+		else:
+			board.market = [card] + market
+		total += value(board, unseen, unseen_key ^ UNSEEN_KEYS[idx], len(board.market) < MARKET_SIZE)
+		unseen.append(idx)
+		unseen[pos], unseen[-1] = unseen[-1], unseen[pos]
+		if stopped():
+			break
+	board.market = market
+	return total / len(positions)
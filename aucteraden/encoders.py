@@ -1,15 +1,25 @@
 import numpy as np
 from aucteraden.board import Board, Move
-from decktet.card import Card, CardSuit
+from decktet.card import Card, CardSuit, CardType
+from decktet.deck import CARD_SUITS
 from encoders.base import Encoder
 
 
+SUIT_BITS = 1 << np.arange(len(CardSuit))
+# The excuse has no suits to write its type under. No other card has every
+# suit, so it is the highest type value in every suit channel.
+EXCUSE_MARK = int(CardType.crowns)
+
+
 class GameStateEncoder(Encoder):
 	MARKET_ROW = 0
 	CHIP_ROW = 0
 	CHIP_COL = 3
 	FIRST_BOARD_ROW = 1
 
+	def __init__(self, variant=None):
+		self.variant = variant if variant is not None else Board.standard_variant
+
 	def name(self):
 		return "GameStateEncoder"
 
@@ -21,47 +31,52 @@ class GameStateEncoder(Encoder):
 			idx += 1
 		for suit, count in board.chips.items():
 			mtx[suit.value][GameStateEncoder.CHIP_COL][GameStateEncoder.CHIP_ROW] = count
-		for row in range(Board.row_count):
-			for col in range(Board.col_count):
+		for row in range(self.variant.row_count):
+			for col in range(self.variant.col_count):
 				card = board.get_card(col, row)
 				if card:
 					self.encode_card(mtx, card, col, row + GameStateEncoder.FIRST_BOARD_ROW)
 		return mtx
 
 	def decode(self, mtx):
-		board = Board()
+		board = Board(self.variant)
 		for idx in range(3):
 			card = self.decode_card(mtx, idx, 0)
 			if card is not None:
 				board.market.insert(0, card)
-		board.chips = {}
-		for suit in CardSuit:
-			board.chips[suit] = mtx[suit.value][GameStateEncoder.CHIP_COL][GameStateEncoder.CHIP_ROW]
-		for row in range(Board.row_count):
-			for col in range(Board.col_count):
+		board.chips = {suit: mtx[suit.value][GameStateEncoder.CHIP_COL][GameStateEncoder.CHIP_ROW] for suit in CardSuit}
+		for row in range(self.variant.row_count):
+			for col in range(self.variant.col_count):
 				card = self.decode_card(mtx, col, row + GameStateEncoder.FIRST_BOARD_ROW)
 				if card:
 					board.place_card(card, col, row)
 		return board
 
 	def shape(self):
-		return len(CardSuit), 4, 5  # suit, col, row
+		return len(CardSuit), self.variant.col_count, self.variant.row_count + 1  # suit, col, row
 
 	def encode_card(self, mtx, card, col, row):
-		for suit in card.suits_list:
-			mtx[suit.value][col][row] = card.type
+		if card.type == CardType.excuse:
+			mtx[:, col, row] = EXCUSE_MARK
+		else:
+			mtx[CARD_SUITS[card.index], col, row] = card.type
 
 	def decode_card(self, mtx, col, row):
-		suits = []
-		type = None
-		for suit in CardSuit:
-			t = mtx[suit.value][col][row]
-			if t > 0:
-				suits.append(suit)
-				type = t
-		if type is not None:
-			return Card(type, "?", suits)
-		return None
+		types = mtx[:, col, row]
+		present = types > 0
+		if not present.any():
+			return None
+		if (types == EXCUSE_MARK).all():
+			type, present = CardType.excuse, ~present
+		else:
+			type = types[present][-1]
+		# Only cards of the decktet decode: a new Card would grow the
+		# registry past the tables indexed by card
+		card = Card.lookup(type, np.dot(present, SUIT_BITS))
+		if card is None:
+			suits = "".join(Card.suit_map[suit] for suit in CardSuit if present[suit.value])
+			raise ValueError(f"no card of type {int(type)} with suits {suits} at col {col}, row {row}")
+		return card
 
 
 class MoveEncoder(Encoder):
@@ -70,6 +85,9 @@ class MoveEncoder(Encoder):
 	CHIP_OFFSET = 4
 	BOARD_COL_OFFSET = 10
 
+	def __init__(self, variant=None):
+		self.variant = variant if variant is not None else Board.standard_variant
+
 	def name(self):
 		return "MoveEncoder"
 
@@ -81,7 +99,7 @@ class MoveEncoder(Encoder):
 			mtx[MoveEncoder.BUY_OFFSET + move.buy_card_index] = 1
 			for suit, count in move.payment.items():
 				mtx[MoveEncoder.CHIP_OFFSET + suit.value] = count
-			mtx[MoveEncoder.BOARD_COL_OFFSET + move.col + move.row * Board.col_count] = 1
+			mtx[MoveEncoder.BOARD_COL_OFFSET + move.col + move.row * self.variant.col_count] = 1
 		return mtx
 
 	def decode(self, mtx):
@@ -99,10 +117,10 @@ class MoveEncoder(Encoder):
 			val = mtx[MoveEncoder.CHIP_OFFSET + suit.value]
 			if val > 0:
 				payment[suit] = val
-		for idx in range(16):
+		for idx in range(self.variant.cell_count):
 			if mtx[MoveEncoder.BOARD_COL_OFFSET + idx] == 1:
-				col = idx % Board.col_count
-				row = idx // Board.row_count
+				col = idx % self.variant.col_count
+				row = idx // self.variant.col_count
 				break
 		return Move.buy_and_place(buy_card_index, payment, col, row)
 
@@ -113,11 +131,11 @@ class MoveEncoder(Encoder):
 			s += f"Buy #{idx}: " + fmt % mtx[MoveEncoder.BUY_OFFSET + idx] + "\n"
 		for suit in CardSuit:
 			s += f"{Card.suit_map[suit]}: " + fmt % mtx[MoveEncoder.CHIP_OFFSET + suit.value] + "\n"
-		for row in range(4):
-			for col in range(4):
-				s += fmt % mtx[MoveEncoder.BOARD_COL_OFFSET + col + row * Board.col_count] + "  "
+		for row in range(self.variant.row_count):
+			for col in range(self.variant.col_count):
+				s += fmt % mtx[MoveEncoder.BOARD_COL_OFFSET + col + row * self.variant.col_count] + "  "
 			s += "\n"
 		return s
 
 	def shape(self):
-		return (MoveEncoder.BOARD_COL_OFFSET + 16,)
+		return (MoveEncoder.BOARD_COL_OFFSET + self.variant.cell_count,)
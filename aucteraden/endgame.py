@@ -0,0 +1,119 @@
+from aucteraden.actions import CHURN_ACTION
+from aucteraden.agent import Agent
+from aucteraden.board import Move
+from aucteraden.chance import draw_average, position_key, unseen_cards
+from aucteraden.movegen import legal_actions
+from aucteraden.transposition import TranspositionTable
+from decktet.deck import Deck
+
+
+class EndgameSolver:
+	# Expected best score of the last turns. Every draw averages over all
+	# unseen cards (the deck's contents, not its order). With at most
+	# max_deck cards left every move, churn included, is searched and the
+	# value is exact. A search started by max_free with a larger deck
+	# churns only when nothing can be placed: there a churn deals three of
+	# many cards, and searching it everywhere would multiply the tree by
+	# the cube of the deck size.
+	# Values are memoized by the position's Zobrist key together with the
+	# unseen cards, across moves and games, and chain totals by grid key.
+	def __init__(self, max_deck=4, max_free=2, node_limit=50000, table=None):
+		# A search that needs more than node_limit positions gives up and
+		# returns no move, so the caller can fall back to its own agent
+		self.max_deck = max_deck
+		self.max_free = max_free
+		self.node_limit = node_limit
+		self.table = table if table is not None else TranspositionTable(1 << 18)
+		self.chain_table = TranspositionTable(1 << 16)
+		self.nodes = 0
+		self.aborted = False
+
+	def applies(self, board):
+		deck = len(board.deck)
+		return 0 < deck and (deck <= self.max_deck or bin(board.bits.free).count("1") <= self.max_free)
+
+	def solve(self, board):
+		# Returns (expected final score, best action), (None, None) when the
+		# node limit was hit
+		board = board.copy()
+		unseen, unseen_key = unseen_cards(board)
+		# The search deck is the unseen list itself, so len(board.deck)
+		# follows the cards taken out while drawing
+		board.deck = Deck.from_order(unseen)
+		self.nodes = 0
+		self.aborted = False
+		result = self.max_value(board, unseen, unseen_key)
+		if self.aborted:
+			return None, None
+		return result
+
+	def max_value(self, board, unseen, unseen_key):
+		self.nodes += 1
+		if self.nodes > self.node_limit:
+			self.aborted = True
+		if self.aborted:
+			return 0, None
+		key = position_key(board, unseen_key)
+		entry = self.table.get(key)
+		if entry is not None:
+			value, action = entry
+			return board.score + value, action
+
+		actions = legal_actions(board)
+		if not actions or len(unseen) <= self.max_deck:
+			actions.append(CHURN_ACTION)
+		scores = board.score_moves(actions, self.chain_table).tolist()
+		order = sorted(range(len(actions)), key=lambda i: -scores[i])
+		free = bin(board.bits.free).count("1")
+		best_value = None
+		best_action = None
+		for i in order:
+			action = actions[i]
+			# The refill after the last card or into the last cell ends the game
+			if len(unseen) <= 1 or (free == 1 and action != CHURN_ACTION):
+				value = scores[i]
+			else:
+				undo = board.make_move(action)
+				value = self.draw_value(board, unseen, unseen_key, True)
+				board.unmake_move(action, undo)
+			if self.aborted:
+				break
+			if best_value is None or value > best_value:
+				best_value = value
+				best_action = action
+		if self.aborted:
+			return 0, None
+		self.table.put(key, (best_value - board.score, best_action))
+		return best_value, best_action
+
+	def draw_value(self, board, unseen, unseen_key, is_discard):
+		def value(board, unseen, unseen_key, short):
+			if not unseen or not board.bits.free:
+				return board.quick_score()
+			if short:
+				return self.draw_value(board, unseen, unseen_key, False)
+			return self.max_value(board, unseen, unseen_key)[0]
+		return draw_average(board, unseen, unseen_key, range(len(unseen)), is_discard, value, lambda: self.aborted)
+
+
+class EndgameBot(Agent):
+	# Plays like `agent` until the endgame solver applies, then exactly
+	def __init__(self, agent, solver=None):
+		self.agent = agent
+		self.solver = solver if solver is not None else EndgameSolver()
+
+	@property
+	def rng(self):
+		return self.agent.rng
+
+	@rng.setter
+	def rng(self, rng):
+		self.agent.rng = rng
+
+	def select_move(self, game_state):
+		board = game_state.board
+		if self.solver.applies(board):
+			_, action = self.solver.solve(board)
+			if action is not None:
+				return Move.from_action(action, board.actions)
+		return self.agent.select_move(game_state)
@@ -0,0 +1,193 @@
+import multiprocessing as mp
+import queue
+import time
+
+import numpy as np
+from aucteraden.agent import ModelGymBot, checkpoint_path_of, compile_model
+
+
+# One process holds the model and answers the inference requests of every
+# player process. Requests wait until max_batch observations have arrived
+# or the oldest one has waited max_wait seconds, then run in one forward
+# pass. Players import no TensorFlow: a client is two queues. The server is
+# spawned, never forked: a fork of a process that has loaded TensorFlow
+# can hang in the child. Scripts that start it need a __main__ guard.
+
+
+def _serve(model_name, checkpoint_path, max_batch, max_wait, requests, responses, control):
+	from aucteraden import models
+	model = getattr(models, model_name)()
+	model.load_weights(checkpoint_path or checkpoint_path_of(model))
+	predict = compile_model(model)
+	# Trace before the first request, so it does not wait for it
+	predict(np.zeros((1, model.inputs[0].shape[-1]), dtype=np.float32))
+	control.put("ready")
+	stats = ServerStats(max_batch)
+	running = True
+	while running:
+		message = requests.get()
+		if message is None:
+			break
+		if message == "stats":
+			control.put(stats.summary())
+			continue
+		batch = [message]
+		rows = len(message[1])
+		deadline = message[2] + max_wait
+		while rows < max_batch:
+			timeout = deadline - time.monotonic()
+			if timeout <= 0:
+				break
+			try:
+				message = requests.get(timeout=timeout)
+			except queue.Empty:
+				break
+			if message is None:
+				running = False
+				break
+			if message == "stats":
+				control.put(stats.summary())
+				continue
+			batch.append(message)
+			rows += len(message[1])
+
+		start = time.monotonic()
+		outputs = predict(np.concatenate([observations for _, observations, _ in batch]))
+		offset = 0
+		for client_id, observations, _ in batch:
+			responses[client_id].put(outputs[offset:offset + len(observations)])
+			offset += len(observations)
+		stats.add(rows, [start - sent for _, _, sent in batch], time.monotonic() - start)
+
+
+class ServerStats:
+	def __init__(self, max_batch):
+		self.max_batch = max_batch
+		self.requests = 0
+		self.batches = 0
+		self.rows = 0
+		self.inference_time = 0
+		self.latencies = []
+
+	def add(self, rows, latencies, inference_time):
+		self.batches += 1
+		self.rows += rows
+		self.requests += len(latencies)
+		self.latencies += latencies
+		self.inference_time += inference_time
+
+	def summary(self):
+		# Queue latency is the time from a request being sent to its batch
+		# starting; fill is the mean batch size over max_batch
+		latencies = np.array(self.latencies) * 1000 if self.latencies else np.zeros(1)
+		batches = max(self.batches, 1)
+		return {
+			"requests": self.requests,
+			"batches": self.batches,
+			"rows": self.rows,
+			"mean_batch": self.rows / batches,
+			"fill": self.rows / batches / self.max_batch,
+			"latency_ms": float(latencies.mean()),
+			"latency_p50_ms": float(np.percentile(latencies, 50)),
+			"latency_p95_ms": float(np.percentile(latencies, 95)),
+			"latency_max_ms": float(latencies.max()),
+			"inference_ms": 1000 * self.inference_time / batches,
+		}
+
+
+def format_stats(stats):
+	return ("%(requests)d requests in %(batches)d batches, %(mean_batch).1f rows/batch (fill %(fill).0f%%), "
+		"queue latency %(latency_ms).2f ms (p50 %(latency_p50_ms).2f, p95 %(latency_p95_ms).2f, max %(latency_max_ms).2f), "
+		"inference %(inference_ms).2f ms/batch") % dict(stats, fill=100 * stats["fill"])
+
+
+class InferenceClient:
+	# Handed to a player process when it is created; one outstanding request
+	# at a time, so a client must not be shared between processes. A reply
+	# that takes longer than timeout seconds means the server is gone.
+	def __init__(self, client_id, requests, responses, timeout):
+		self.client_id = client_id
+		self.requests = requests
+		self.responses = responses
+		self.timeout = timeout
+
+	def predict(self, observations):
+		observations = np.asarray(observations, dtype=np.float32).reshape(len(observations), -1)
+		self.requests.put((self.client_id, observations, time.monotonic()))
+		try:
+			return self.responses.get(timeout=self.timeout)
+		except queue.Empty:
+			raise RuntimeError(f"no reply from the inference server in {self.timeout}s") from None
+
+
+class InferenceServer:
+	# model_name is a class of aucteraden.models, built and loaded in the
+	# server process. Clients are made before the players are started. The
+	# server must be ready within timeout seconds of start().
+	def __init__(self, model_name="MultiOutputChanneledModel", checkpoint_path=None, max_batch=32, max_wait=0.002, timeout=60.0):
+		self.model_name = model_name
+		self.checkpoint_path = checkpoint_path
+		self.max_batch = max_batch
+		self.max_wait = max_wait
+		self.timeout = timeout
+		self.context = mp.get_context("spawn")
+		self.requests = self.context.Queue()
+		self.control = self.context.Queue()
+		self.responses = []
+		self.process = None
+
+	def client(self):
+		if self.process is not None:
+			raise RuntimeError("clients must be created before the server starts")
+		self.responses.append(self.context.Queue())
+		return InferenceClient(len(self.responses) - 1, self.requests, self.responses[-1], self.timeout)
+
+	def start(self):
+		if self.process is not None:
+			return
+		self.process = self.context.Process(target=_serve, args=(self.model_name, self.checkpoint_path, self.max_batch, self.max_wait, self.requests, self.responses, self.control), daemon=True)
+		self.process.start()
+		# Ready once the model is loaded
+		self.wait_control()
+
+	def wait_control(self):
+		# The server's next control message, failing if it has died or has
+		# not answered in timeout seconds
+		deadline = time.monotonic() + self.timeout
+		while True:
+			try:
+				return self.control.get(timeout=1)
+			except queue.Empty:
+				if not self.process.is_alive():
+					code = self.process.exitcode
+					self.process = None
+					raise RuntimeError(f"inference server exited with code {code}")
+				if time.monotonic() > deadline:
+					self.process.terminate()
+					self.process.join()
+					self.process = None
+					raise RuntimeError(f"no answer from the inference server in {self.timeout}s")
+
+	def stats(self):
+		self.requests.put("stats")
+		return self.wait_control()
+
+	def close(self):
+		if self.process is None:
+			return
+		self.requests.put(None)
+		self.process.join()
+		self.process = None
+
+	def __enter__(self):
+		self.start()
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+
+class RemoteModelGymBot(ModelGymBot):
+	# ModelGymBot whose model runs in an InferenceServer
+	def __init__(self, client, verbose=False, variant=None):
+		super().__init__(verbose=verbose, variant=variant, predict=client.predict)
@@ -0,0 +1,51 @@
+from aucteraden.actions import PAYMENTS, payment_options
+from aucteraden.bitboard import iter_bits
+from aucteraden.board import Move, payment_dicts
+
+
+# Legal buy-and-place moves of a board in the order the agents scan them:
+# last market card first (the free one), then its payments as given by
+# payment_options(), which are precomputed once per card and cost, then
+# free cells in ascending order (see Board.free_cells). Churn is never
+# generated, it is always legal.
+
+
+def iter_actions(board):
+	market = board.market
+	encode = board.actions.encode
+	can_pay = board.bits.can_pay
+	for buy in reversed(range(len(market))):
+		card = market[buy]
+		cells = board.bits.legal_placements(card.type)
+		if not cells:
+			continue
+		for payment in payment_options(card, len(market) - buy - 1):
+			if can_pay(PAYMENTS[payment]):
+				for cell in iter_bits(cells):
+					yield encode(buy, payment, cell)
+
+
+def legal_actions(board):
+	return list(iter_actions(board))
+
+
+def has_legal_action(board):
+	for _ in iter_actions(board):
+		return True
+	return False
+
+
+def iter_moves(board):
+	col_count = board.col_count
+	for action in iter_actions(board):
+		buy, payment, cell = board.actions.table[action]
+		yield Move(buy, payment_dicts[payment], cell % col_count, cell // col_count, False)
+
+
+def legal_moves(board):
+	return list(iter_moves(board))
+
+
+def chip_combos(card, cost):
+	# Read-only payment mappings of payment_options()
+	return [payment_dicts[payment] for payment in payment_options(card, cost)]
@@ -0,0 +1,91 @@
+import os
+
+import numpy as np
+from aucteraden.actions import CHURN_ACTION, MARKET_SIZE
+from aucteraden.chance import unseen_cards
+from aucteraden.movegen import legal_actions
+from aucteraden.seeding import rng_choice
+from aucteraden.symmetry import canonical_cell, symmetries
+
+
+# Opening book: the first move of a game for every market and chips seen
+# when it was built. On an empty grid that is the whole position, and
+# cells that are images of each other under the grid symmetries make the
+# same move, so only canonical cells are searched and stored.
+
+
+def book_path(variant):
+	return "aucteraden/opening_%dx%d_%d.npz" % (variant.col_count, variant.row_count, len(variant.deck))
+
+
+def opening_key(board):
+	market = [card.index for card in board.market]
+	return tuple(market + [-1] * (MARKET_SIZE - len(market))) + tuple(board.bits.chips)
+
+
+def canonical_actions(board):
+	# Legal first moves, one cell per symmetry class
+	actions = []
+	for action in legal_actions(board):
+		_, _, cell = board.actions.table[action]
+		if cell == canonical_cell(cell, board.col_count, board.row_count):
+			actions.append(action)
+	return actions
+
+
+def best_opening(board, searcher):
+	# searcher is an ExpectimaxBot without a time budget
+	actions = canonical_actions(board)
+	if not actions:
+		return CHURN_ACTION
+	board = board.copy()
+	unseen, unseen_key = unseen_cards(board)
+	return searcher.search_root(board, actions, unseen, unseen_key, searcher.depth)
+
+
+class OpeningBook:
+	# Loaded from path on the first lookup; a missing file is an empty book
+	def __init__(self, path):
+		self.path = path
+		self.shape = None
+		self.entries = None
+
+	def load(self):
+		if self.entries is None:
+			self.entries = {}
+			if os.path.exists(self.path):
+				data = np.load(self.path)
+				self.shape = tuple(data["shape"].tolist())
+				for key, action in zip(data["keys"].tolist(), data["actions"].tolist()):
+					self.entries[tuple(key)] = action
+		return self.entries
+
+	def __len__(self):
+		return len(self.load())
+
+	def lookup(self, board, rng=None):
+		# The book action, or None off the book. With rng the cell is moved
+		# by a random symmetry, which keeps generated games varied.
+		if not board.grid_empty:
+			return None
+		entries = self.load()
+		if self.shape != (board.col_count, board.row_count):
+			return None
+		action = entries.get(opening_key(board))
+		if action is None or action == CHURN_ACTION or rng is None:
+			return action
+		buy, payment, cell = board.actions.table[action]
+		perm = rng_choice(rng, symmetries(board.col_count, board.row_count))
+		return board.actions.encode(buy, payment, perm[cell])
+
+	def add(self, board, action):
+		entries = self.load()
+		if self.shape is None:
+			self.shape = (board.col_count, board.row_count)
+		entries[opening_key(board)] = action
+
+	def save(self):
+		entries = self.load()
+		keys = np.array(list(entries.keys()), dtype=np.int16).reshape(len(entries), -1)
+		actions = np.array(list(entries.values()), dtype=np.int32)
+		np.savez_compressed(self.path, shape=np.array(self.shape, dtype=np.int16), keys=keys, actions=actions)
@@ -0,0 +1,173 @@
+import multiprocessing as mp
+import queue
+import random
+import traceback
+from multiprocessing import shared_memory
+
+import numpy as np
+from aucteraden.actions import CHURN_ACTION, MARKET_SIZE, PAYMENTS
+from aucteraden.agent import Agent, ISMCTSSearch
+from aucteraden.board import Board, Move, Variant
+from aucteraden.movegen import legal_actions
+from aucteraden.seeding import rng_bits
+from aucteraden.zobrist import MAX_CELLS
+from decktet.deck import CARD_COUNT, Deck
+
+
+# Position layout in shared memory (int16): col count, row count, initial
+# chips, snapshot length, deck length, Board.snapshot() bytes, deck order
+HEADER_SIZE = 5
+POSITION_SIZE = HEADER_SIZE + MAX_CELLS + 13 + CARD_COUNT
+
+
+def encode_position(board, out):
+	data, order = board.snapshot()
+	out[:HEADER_SIZE] = (board.col_count, board.row_count, board.initial_chip_count, len(data), len(order))
+	out[HEADER_SIZE:HEADER_SIZE + len(data)] = np.frombuffer(data, dtype=np.uint8)
+	offset = HEADER_SIZE + len(data)
+	out[offset:offset + len(order)] = order
+
+
+_variants = {}
+
+
+def decode_position(position):
+	col_count, row_count, initial_chip_count, data_len, order_len = position[:HEADER_SIZE].tolist()
+	data = bytes(position[HEADER_SIZE:HEADER_SIZE + data_len].astype(np.uint8))
+	offset = HEADER_SIZE + data_len
+	order = tuple(position[offset:offset + order_len].tolist())
+	key = (col_count, row_count, initial_chip_count, order_len)
+	if key not in _variants:
+		_variants[key] = Variant(col_count, row_count, initial_chip_count, Deck.from_order(order))
+	return Board.from_snapshot((data, order), _variants[key])
+
+
+def _worker(index, position_name, stats_name, stats_shape, tasks, done):
+	position_shm = shared_memory.SharedMemory(name=position_name)
+	stats_shm = shared_memory.SharedMemory(name=stats_name)
+	position = np.ndarray((POSITION_SIZE,), dtype=np.int16, buffer=position_shm.buf)
+	stats = np.ndarray(stats_shape, dtype=np.float64, buffer=stats_shm.buf)
+	search = ISMCTSSearch(reuse=False)
+	while True:
+		task = tasks.get()
+		if task is None:
+			break
+		try:
+			seed, search.playouts, search.time_budget, search.exploration, search.rollout = task
+			board = decode_position(position)
+			search.search(board, random.Random(seed + index))
+			stats[index] = 0
+			for action, chance in search.last_root.children.items():
+				stats[index, action, 0] = chance.visits
+				stats[index, action, 1] = chance.total
+			done.put((index, search.last_playouts, None))
+		except Exception:
+			done.put((index, 0, traceback.format_exc()))
+	del position, stats
+	position_shm.close()
+	stats_shm.close()
+
+
+class RootParallelSearch:
+	# Root-parallel ISMCTS: every worker process searches the same root with
+	# its own determinizations, the visit counts and score totals of the
+	# root moves are summed, and the most visited move is played. The root
+	# position goes to the workers and the statistics come back through
+	# shared memory, so no Board or Card is pickled per move. Workers do not
+	# keep trees between moves.
+	def __init__(self, workers=None, playouts=1000, time_budget=None, exploration=10.0, rollout="random"):
+		if playouts is None and time_budget is None:
+			raise ValueError("RootParallelSearch needs a playout count or a time budget")
+		self.workers = workers or mp.cpu_count()
+		self.playouts = playouts
+		self.time_budget = time_budget
+		self.exploration = exploration
+		self.rollout = rollout
+		self.processes = []
+		self.last_playouts = 0
+
+	def start(self):
+		if self.processes:
+			return
+		# Room for the root actions of the largest grid
+		self.stats_shape = (self.workers, 1 + MARKET_SIZE * len(PAYMENTS) * MAX_CELLS, 2)
+		self.position_shm = shared_memory.SharedMemory(create=True, size=POSITION_SIZE * 2)
+		self.stats_shm = shared_memory.SharedMemory(create=True, size=int(np.prod(self.stats_shape)) * 8)
+		self.position = np.ndarray((POSITION_SIZE,), dtype=np.int16, buffer=self.position_shm.buf)
+		self.stats = np.ndarray(self.stats_shape, dtype=np.float64, buffer=self.stats_shm.buf)
+		self.tasks = [mp.Queue() for _ in range(self.workers)]
+		self.done = mp.Queue()
+		for index in range(self.workers):
+			process = mp.Process(target=_worker, args=(index, self.position_shm.name, self.stats_shm.name, self.stats_shape, self.tasks[index], self.done), daemon=True)
+			process.start()
+			self.processes.append(process)
+
+	def close(self):
+		if not self.processes:
+			return
+		for tasks in self.tasks:
+			tasks.put(None)
+		for process in self.processes:
+			process.join()
+		self.processes = []
+		del self.position, self.stats
+		self.position_shm.close()
+		self.position_shm.unlink()
+		self.stats_shm.close()
+		self.stats_shm.unlink()
+
+	def wait_worker(self):
+		# The next finished worker, failing if one has died without answering
+		while True:
+			try:
+				return self.done.get(timeout=1)
+			except queue.Empty:
+				for index, process in enumerate(self.processes):
+					if not process.is_alive():
+						code = process.exitcode
+						self.close()
+						raise RuntimeError(f"search worker {index} exited with code {code}")
+
+	def __enter__(self):
+		self.start()
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+	def search(self, board, rng):
+		self.start()
+		encode_position(board, self.position)
+		seed = rng_bits(rng)
+		# Each worker gets an equal share of the playout budget
+		playouts = -(-self.playouts // self.workers) if self.playouts is not None else None
+		for tasks in self.tasks:
+			tasks.put((seed, playouts, self.time_budget, self.exploration, self.rollout))
+		self.last_playouts = 0
+		for _ in range(self.workers):
+			index, count, error = self.wait_worker()
+			if error is not None:
+				self.close()
+				raise RuntimeError(f"search worker {index} failed:\n{error}")
+			self.last_playouts += count
+
+		merged = self.stats[:, :board.actions.count].sum(axis=0)
+		visits = merged[:, 0]
+		if visits.max() == 0:
+			return (legal_actions(board) or [CHURN_ACTION])[0]
+		# Most visited move, ties (common with many workers) by mean score
+		means = merged[:, 1] / np.maximum(visits, 1)
+		return int(np.argmax(np.where(visits == visits.max(), means, -np.inf)))
+
+
+class RootParallelBot(Agent):
+	def __init__(self, workers=None, playouts=1000, time_budget=None, exploration=10.0, rollout="random", rng=None):
+		super().__init__(rng)
+		self.search = RootParallelSearch(workers, playouts, time_budget, exploration, rollout)
+
+	def select_move(self, game_state):
+		board = game_state.board
+		return Move.from_action(self.search.search(board, self.rng), board.actions)
+
+	def close(self):
+		self.search.close()
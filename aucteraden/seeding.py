@@ -0,0 +1,44 @@
+import random
+import numpy as np
+
+
+# Independent random streams of one game
+DEAL_STREAM = 0
+AGENT_STREAM = 1
+
+
+def game_seed(run_seed, game_index, stream=DEAL_STREAM):
+	# Depends only on (run seed, game index, stream), so games can be split
+	# across processes in any way and still be reproduced exactly
+	state = np.random.SeedSequence(run_seed, spawn_key=(game_index, stream)).generate_state(2, dtype=np.uint64)
+	return int(state[0]) << 64 | int(state[1])
+
+
+def game_rng(run_seed, game_index, stream=DEAL_STREAM):
+	return random.Random(game_seed(run_seed, game_index, stream))
+
+
+def game_generator(run_seed, game_index, stream=DEAL_STREAM):
+	return np.random.default_rng(np.random.SeedSequence(run_seed, spawn_key=(game_index, stream)))
+
+
+# Draws that work with a random.Random (or the random module) and with a
+# NumPy Generator alike; a random.Random draws exactly as its own methods
+
+def rng_choice(rng, seq):
+	if isinstance(rng, np.random.Generator):
+		return seq[int(rng.integers(len(seq)))]
+	return rng.choice(seq)
+
+
+def rng_sample(rng, count, k):
+	# k distinct indexes below count
+	if isinstance(rng, np.random.Generator):
+		return rng.choice(count, k, replace=False).tolist()
+	return rng.sample(range(count), k)
+
+
+def rng_bits(rng, bits=64):
+	if isinstance(rng, np.random.Generator):
+		return int.from_bytes(rng.bytes(bits // 8), "little")
+	return rng.getrandbits(bits)
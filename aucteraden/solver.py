@@ -0,0 +1,187 @@
+import time
+from aucteraden.actions import CHURN_ACTION
+from aucteraden.bitboard import SUIT_COUNT, chain_score
+from aucteraden.movegen import legal_actions
+from decktet.card import Card, CardType
+
+
+# Perfect-information solver: with the deck order known the game is
+# deterministic. A beam search finds a good line fast, then an optional
+# depth-first branch and bound tries to improve it and prove it optimal,
+# pruning every position whose upper bound cannot beat the best line.
+
+
+def is_over(board):
+	return len(board.deck) == 0 or board.bits.free == 0
+
+
+def upper_bound(board):
+	# Admissible bound on the final score. At most min(free cells, cards
+	# left) moves remain; each fills one cell and adds one card to the
+	# chains of its suits, so the chains of all suits together grow by at
+	# most the suit counts of the best cards left. Chips never go up, so
+	# suits at zero stay penalized; everything else may end penalty free.
+	bits = board.bits
+	moves = min(bin(bits.free).count("1"), len(board.deck))
+	available = [0] * SUIT_COUNT
+	aces = 0
+	crowns = 0
+	suit_counts = []
+	for card in board.market + [Card.registry[idx] for idx in board.deck.order[board.deck.top:]]:
+		for suit in range(SUIT_COUNT):
+			if card.mask >> suit & 1:
+				available[suit] += 1
+		suit_counts.append(len(card.suits_list))
+		if card.type == CardType.ace:
+			aces |= card.mask
+		elif card.type == CardType.crowns:
+			crowns |= card.mask
+	for card in board.grid:
+		if card is not None:
+			if card.type == CardType.ace:
+				aces |= card.mask
+			elif card.type == CardType.crowns:
+				crowns |= card.mask
+	budget = sum(sorted(suit_counts, reverse=True)[:moves])
+
+	bound = board.score + bits.empty_penalty + 5 * moves
+	# best[b]: the highest chain total of the suits so far that uses b
+	# chain extensions
+	best = [0] * (budget + 1)
+	for suit in range(SUIT_COUNT):
+		if bits.chips[suit] == 0:
+			bound -= 5
+		placed = bin(bits.suit_masks[suit]).count("1")
+		values = []
+		for extra in range(min(moves, available[suit], max(7 - placed, 0)) + 1):
+			if placed + extra == 0:
+				values.append(0)
+			else:
+				value = chain_score(min(placed + extra, 7), aces >> suit & 1, crowns >> suit & 1)
+				values.append(max(value, 0) if placed == 0 else value)
+		best = [max(best[b - extra] + value for extra, value in enumerate(values) if extra <= b) for b in range(budget + 1)]
+	return bound + best[budget]
+
+
+def play_action(board, action):
+	# make_move and the market refill, with what is needed to take them back
+	undo = board.make_move(action)
+	top = board.deck.top
+	board.refill_market(True)
+	return undo, top
+
+
+def take_back(board, action, undo, top):
+	board.deck.top = top
+	board.unmake_move(action, undo)
+
+
+class Solution:
+	def __init__(self, score, actions, upper_bound, optimal, nodes, elapsed):
+		self.score = score
+		self.actions = actions
+		self.upper_bound = upper_bound
+		self.optimal = optimal
+		self.nodes = nodes
+		self.elapsed = elapsed
+
+	def __str__(self):
+		state = "optimal" if self.optimal else "bound %d" % self.upper_bound
+		return "score %d (%s), %d moves, %d nodes, %.3fs" % (self.score, state, len(self.actions), self.nodes, self.elapsed)
+
+
+class BeamSolver:
+	def __init__(self, beam_width=64, node_limit=2000, time_limit=None):
+		# node_limit=0 skips the branch and bound and returns the beam line
+		self.beam_width = beam_width
+		self.node_limit = node_limit
+		self.time_limit = time_limit
+
+	def solve(self, game_state):
+		start = time.perf_counter()
+		board = game_state.board.copy()
+		root_bound = upper_bound(board)
+		self.nodes = 0
+		self.best_score, self.best_actions = self.beam_search(board)
+		self.aborted = False
+		self.search_nodes = 0
+		if self.node_limit and self.best_score < root_bound:
+			self.deadline = start + self.time_limit if self.time_limit is not None else None
+			self.branch_and_bound(board, [])
+		else:
+			self.aborted = self.best_score < root_bound
+		optimal = not self.aborted
+		bound = self.best_score if optimal else root_bound
+		return Solution(self.best_score, self.best_actions, bound, optimal, self.nodes, time.perf_counter() - start)
+
+	def beam_search(self, board):
+		# Children of the whole beam are ranked by their score right after
+		# the move, which Board.score_moves gives without copying; only the
+		# best ones are made, and positions reached twice are kept once
+		if is_over(board):
+			return board.quick_score(), []
+		beam = [(board, [])]
+		best_score = None
+		best_actions = []
+		while beam:
+			ranked = []
+			for idx, (parent, actions) in enumerate(beam):
+				moves = legal_actions(parent) + [CHURN_ACTION]
+				for action, score in zip(moves, parent.score_moves(moves).tolist()):
+					ranked.append((-score, idx, action))
+			ranked.sort()
+			next_beam = []
+			seen = set()
+			for _, idx, action in ranked:
+				parent, actions = beam[idx]
+				child = parent.copy()
+				child.make_move(action)
+				child.refill_market(True)
+				self.nodes += 1
+				line = actions + [action]
+				if is_over(child):
+					score = child.quick_score()
+					if best_score is None or score > best_score:
+						best_score = score
+						best_actions = line
+					continue
+				key = child.key
+				if key in seen or (best_score is not None and upper_bound(child) <= best_score):
+					continue
+				seen.add(key)
+				next_beam.append((child, line))
+				if len(next_beam) == self.beam_width:
+					break
+			beam = next_beam
+		return best_score, best_actions
+
+	def branch_and_bound(self, board, line):
+		if self.aborted:
+			return
+		if is_over(board):
+			score = board.quick_score()
+			if score > self.best_score:
+				self.best_score = score
+				self.best_actions = list(line)
+			return
+		self.nodes += 1
+		self.search_nodes += 1
+		if self.search_nodes > self.node_limit or (self.deadline is not None and time.perf_counter() > self.deadline):
+			self.aborted = True
+			return
+		if upper_bound(board) <= self.best_score:
+			return
+		moves = legal_actions(board) + [CHURN_ACTION]
+		scores = board.score_moves(moves).tolist()
+		for _, action in sorted(zip(scores, moves), key=lambda item: -item[0]):
+			undo, top = play_action(board, action)
+			line.append(action)
+			self.branch_and_bound(board, line)
+			line.pop()
+			take_back(board, action, undo, top)
+			if self.aborted:
+				return
+
+
+def solve(game_state, beam_width=64, node_limit=2000, time_limit=None):
+	return BeamSolver(beam_width, node_limit, time_limit).solve(game_state)
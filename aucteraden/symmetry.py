@@ -0,0 +1,68 @@
+from aucteraden.bitboard import iter_bits
+
+
+# Rotations and reflections of the grid as cell permutations. Chain scores
+# and placement rules only depend on neighborhoods, so they are invariant
+# under all of them: 8 for square grids, 4 for the others.
+
+_symmetry_cache = {}
+
+
+def symmetries(col_count, row_count):
+	key = (col_count, row_count)
+	if key not in _symmetry_cache:
+		maps = [
+			lambda c, r: (c, r),
+			lambda c, r: (col_count - 1 - c, r),
+			lambda c, r: (c, row_count - 1 - r),
+			lambda c, r: (col_count - 1 - c, row_count - 1 - r),
+		]
+		if col_count == row_count:
+			maps += [
+				lambda c, r: (r, c),
+				lambda c, r: (row_count - 1 - r, c),
+				lambda c, r: (r, col_count - 1 - c),
+				lambda c, r: (row_count - 1 - r, col_count - 1 - c),
+			]
+		perms = []
+		for transform in maps:
+			perm = []
+			for cell in range(col_count * row_count):
+				col, row = transform(cell % col_count, cell // col_count)
+				perm.append(col + row * col_count)
+			perms.append(tuple(perm))
+		_symmetry_cache[key] = tuple(perms)
+	return _symmetry_cache[key]
+
+
+def transform_mask(mask, perm):
+	result = 0
+	for cell in iter_bits(mask):
+		result |= 1 << perm[cell]
+	return result
+
+
+def cell_orbit(cell, col_count, row_count):
+	return sorted(set(perm[cell] for perm in symmetries(col_count, row_count)))
+
+
+def canonical_cell(cell, col_count, row_count):
+	return min(perm[cell] for perm in symmetries(col_count, row_count))
+
+
+def canonical_grid(board):
+	# Smallest image of the grid as a tuple of card indexes (-1 for empty
+	# cells) and the permutation that produces it: the grid occupies
+	# perm[cell] in the canonical form
+	grid = [card.index if card is not None else -1 for card in board.grid]
+	best = None
+	best_perm = None
+	for perm in symmetries(board.col_count, board.row_count):
+		image = [0] * len(grid)
+		for cell, card in enumerate(grid):
+			image[perm[cell]] = card
+		image = tuple(image)
+		if best is None or image < best:
+			best = image
+			best_perm = perm
+	return best, best_perm
@@ -0,0 +1,53 @@
+from collections import OrderedDict
+
+
+class TranspositionTable:
+	# Bounded position cache keyed by Zobrist keys. Entries are evicted in
+	# least-recently-used order; an entry searched to a greater depth is not
+	# replaced by a shallower one.
+	def __init__(self, capacity=1 << 16):
+		self.capacity = capacity
+		self.entries = OrderedDict()
+		self.hits = 0
+		self.misses = 0
+		self.stores = 0
+		self.evictions = 0
+
+	def __len__(self):
+		return len(self.entries)
+
+	def get(self, key, depth=0):
+		entry = self.entries.get(key)
+		if entry is None or entry[0] < depth:
+			self.misses += 1
+			return None
+		self.entries.move_to_end(key)
+		self.hits += 1
+		return entry[1]
+
+	def put(self, key, value, depth=0):
+		entry = self.entries.get(key)
+		if entry is not None:
+			if entry[0] > depth:
+				return
+			self.entries.move_to_end(key)
+		elif len(self.entries) >= self.capacity:
+			self.entries.popitem(last=False)
+			self.evictions += 1
+		self.entries[key] = (depth, value)
+		self.stores += 1
+
+	def clear(self):
+		self.entries.clear()
+
+	def stats(self):
+		lookups = self.hits + self.misses
+		return {
+			"size": len(self.entries),
+			"capacity": self.capacity,
+			"hits": self.hits,
+			"misses": self.misses,
+			"hit_rate": self.hits / lookups if lookups else 0.0,
+			"stores": self.stores,
+			"evictions": self.evictions,
+		}
@@ -0,0 +1,39 @@
+import random
+from decktet.deck import CARD_COUNT
+
+
+MAX_CELLS = 64
+MARKET_SIZE = 3
+CHIP_LEVELS = 32
+SUIT_COUNT = 6
+
+# Fixed seed: keys must be identical in every process that shares a table
+_rng = random.Random(0x5EED2024)
+
+
+def _keys(*shape):
+	if len(shape) == 1:
+		return tuple(_rng.getrandbits(64) for _ in range(shape[0]))
+	return tuple(_keys(*shape[1:]) for _ in range(shape[0]))
+
+
+CELL_KEYS = _keys(MAX_CELLS, CARD_COUNT)
+MARKET_KEYS = _keys(MARKET_SIZE, CARD_COUNT)
+CHIP_KEYS = _keys(SUIT_COUNT, CHIP_LEVELS)
+DECK_KEYS = _keys(MAX_CELLS * 2)
+# Cards not seen yet, for searches that know the deck's contents but not its order
+UNSEEN_KEYS = _keys(CARD_COUNT)
+
+
+def chips_key(chips):
+	key = 0
+	for suit, count in enumerate(chips):
+		key ^= CHIP_KEYS[suit][count % CHIP_LEVELS]
+	return key
+
+
+def market_key(market):
+	key = 0
+	for slot, card in enumerate(market):
+		key ^= MARKET_KEYS[slot][card.index]
+	return key
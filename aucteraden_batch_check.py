@@ -0,0 +1,89 @@
+import argparse
+import sys
+import numpy as np
+from aucteraden.batched import BatchedBoard
+from aucteraden.board import GameState, Variant
+from aucteraden.seeding import AGENT_STREAM, DEAL_STREAM, game_rng
+
+# Plays the same seeded games on BatchedBoard and on scalar Boards in
+# lockstep and reports every game whose state, legal moves or score ever
+# differ. Run it after changing either engine.
+
+def parse_variant(spec):
+	# "5x5", or "6x6e" for the extended deck
+	extended = spec.endswith("e")
+	col_count, row_count = [int(x) for x in spec.rstrip("e").split("x")]
+	if extended:
+		return Variant.extended(col_count, row_count)
+	return Variant(col_count, row_count)
+
+def differences(batch, games, i, scores, over, masks):
+	board = games[i].board
+	found = []
+	if scores[i] != board.quick_score():
+		found.append("score")
+	if over[i] != games[i].is_over():
+		found.append("is_over")
+	if batch.market[i, :batch.market_len[i]].tolist() != [card.index for card in board.market]:
+		found.append("market")
+	if batch.chips[i].tolist() != board.bits.chips:
+		found.append("chips")
+	if batch.top[i] != board.deck.top:
+		found.append("deck")
+	if str(batch.board(i)) != str(board):
+		found.append("grid")
+	if not games[i].is_over() and not (masks[i] == board.legal_action_mask()).all():
+		found.append("legal actions")
+	return found
+
+def check(variant, seed, num_games):
+	games = [GameState.new_game(keep_states=0, rng=game_rng(seed, i, DEAL_STREAM), variant=variant) for i in range(num_games)]
+	batch = BatchedBoard(num_games, variant)
+	batch.prepare([game_rng(seed, i, DEAL_STREAM) for i in range(num_games)])
+	rngs = [game_rng(seed, i, AGENT_STREAM) for i in range(num_games)]
+	failed = {}
+	step = 0
+	while True:
+		scores = batch.calculate_score()
+		over = batch.is_over()
+		masks = batch.legal_action_mask()
+		for i in range(num_games):
+			if i not in failed:
+				found = differences(batch, games, i, scores, over, masks)
+				if found:
+					failed[i] = (step, found)
+		active = np.array([not game.is_over() for game in games])
+		if not active.any():
+			break
+		# A random legal move per game, churning now and then
+		actions = np.zeros(num_games, dtype=np.int64)
+		for i in np.flatnonzero(active):
+			legal = np.flatnonzero(games[i].board.legal_action_mask()[1:]) + 1
+			if len(legal) and rngs[i].random() > 0.05:
+				actions[i] = legal[rngs[i].randrange(len(legal))]
+			games[i] = games[i].apply_move(int(actions[i]))
+			games[i].board.refill_market(True)
+		batch.apply_actions(actions, active)
+		batch.refill_market(True, active)
+		step += 1
+	return failed, step
+
+def main():
+	parser = argparse.ArgumentParser()
+	parser.add_argument("--seed", "-s", type=int, default=42)
+	parser.add_argument("--num-games", "-n", type=int, default=200)
+	parser.add_argument("--variants", type=str, default="4x4,5x5,6x6e", help="Comma-separated grid sizes, e suffix for the extended deck")
+	args = parser.parse_args()
+
+	ok = True
+	for spec in args.variants.split(","):
+		variant = parse_variant(spec)
+		failed, steps = check(variant, args.seed, args.num_games)
+		print(f"{spec} ({variant}): {args.num_games} games, {steps} steps, {len(failed)} mismatched")
+		for i, (step, found) in sorted(failed.items())[:10]:
+			print(f"  game {i}: {', '.join(found)} differ at step {step}")
+		ok = ok and not failed
+	sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,42 @@
+import argparse
+import time
+from aucteraden.agent import OneMoveScoreBot, RandomBot
+from aucteraden.board import GameState, Variant
+from aucteraden.seeding import AGENT_STREAM, DEAL_STREAM, game_rng
+
+def main():
+	parser = argparse.ArgumentParser()
+	parser.add_argument("--seed", "-s", type=int, default=42)
+	parser.add_argument("--num-games", "-n", type=int, default=50)
+	parser.add_argument("--sizes", type=str, default="4,5,6", help="Comma-separated grid sizes")
+	parser.add_argument("--extended", "-e", action="store_true", help="Play with the extended deck")
+	args = parser.parse_args()
+
+	bots = {
+		"RandomBot": RandomBot(),
+		"OneMoveScoreBot": OneMoveScoreBot(25, 4),
+	}
+
+	for size in [int(x) for x in args.sizes.split(",")]:
+		if args.extended:
+			variant = Variant.extended(size, size)
+		else:
+			variant = Variant(size, size)
+		for name, bot in bots.items():
+			moves = 0
+			sum_score = 0
+			start = time.perf_counter()
+			for i in range(args.num_games):
+				game = GameState.new_game(keep_states=0, rng=game_rng(args.seed, i, DEAL_STREAM), variant=variant)
+				bot.rng = game_rng(args.seed, i, AGENT_STREAM)
+				while not game.is_over():
+					game = game.apply_move(bot.select_move(game))
+					game.board.refill_market(True)
+					moves += 1
+				sum_score += game.board.quick_score()
+			elapsed = time.perf_counter() - start
+			print(f"{size}x{size} ({variant}) {name}: {moves} moves, {1e6 * elapsed / moves:.1f} us/move, "
+				f"{moves / elapsed:.0f} moves/s, avg score {sum_score / args.num_games:.2f}")
+
+if __name__ == "__main__":
+	main()
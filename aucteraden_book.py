@@ -0,0 +1,38 @@
+import argparse
+import random
+import time
+from aucteraden.agent import ExpectimaxBot
+from aucteraden.board import GameState, Variant
+from aucteraden.opening import OpeningBook, best_opening, book_path
+from aucteraden.seeding import DEAL_STREAM, game_rng
+
+def main():
+	parser = argparse.ArgumentParser()
+	parser.add_argument("--seed", "-s", type=int, default=42)
+	parser.add_argument("--num-deals", "-n", type=int, default=1000)
+	parser.add_argument("--size", type=int, default=4)
+	parser.add_argument("--extended", "-e", action="store_true", help="Play with the extended deck")
+	parser.add_argument("--depth", type=int, default=2)
+	parser.add_argument("--width", type=int, default=6)
+	parser.add_argument("--samples", type=int, default=6)
+	parser.add_argument("--output", "-o", type=str, help="Book file, extended if it exists")
+	args = parser.parse_args()
+
+	if args.extended:
+		variant = Variant.extended(args.size, args.size)
+	else:
+		variant = Variant(args.size, args.size)
+	book = OpeningBook(args.output or book_path(variant))
+	searcher = ExpectimaxBot(args.depth, args.width, args.samples, rng=random.Random(args.seed))
+	known = len(book)
+	start = time.perf_counter()
+	for i in range(args.num_deals):
+		game = GameState.new_game(keep_states=0, rng=game_rng(args.seed, i, DEAL_STREAM), variant=variant)
+		if book.lookup(game.board) is None:
+			book.add(game.board, best_opening(game.board, searcher))
+	book.save()
+	elapsed = time.perf_counter() - start
+	print(f"{book.path}: {len(book) - known} new openings, {len(book)} total, {elapsed:.1f}s")
+
+if __name__ == "__main__":
+	main()
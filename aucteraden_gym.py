@@ -39,7 +39,7 @@ while render_mode == "human":
 
 	episode_over = False
 	while not episode_over:
-		action = agent.get_action(observation)
+		action = agent.get_action(observation, info)
 		observation, reward, terminated, truncated, info = env.step(action)
 		episode_over = terminated or truncated
 
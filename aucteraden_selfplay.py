@@ -0,0 +1,45 @@
+import argparse
+import multiprocessing as mp
+import time
+from aucteraden.inference import InferenceServer, RemoteModelGymBot, format_stats
+from gymnasium_env.aucteraden import AucteradenEnv
+
+def play(index, client, num_games, seed, results):
+	env = AucteradenEnv()
+	agent = RemoteModelGymBot(client)
+	for i in range(num_games):
+		observation, info = env.reset(seed=seed + index * num_games + i)
+		terminated = False
+		while not terminated:
+			observation, _, terminated, _, info = env.step(agent.get_action(observation, info))
+		results.put(env.game.board.quick_score())
+
+def main():
+	parser = argparse.ArgumentParser()
+	parser.add_argument("--seed", "-s", type=int, default=42)
+	parser.add_argument("--workers", "-w", type=int, default=mp.cpu_count())
+	parser.add_argument("--num-games", "-n", type=int, default=10, help="Games per worker")
+	parser.add_argument("--model", "-m", type=str, default="MultiOutputChanneledModel")
+	parser.add_argument("--checkpoint", type=str, help="Weights file, aucteraden/training_1/<model name>.weights.h5 by default")
+	parser.add_argument("--max-batch", type=int, default=32)
+	parser.add_argument("--max-wait", type=float, default=0.002, help="Seconds a request may wait for its batch to fill")
+	args = parser.parse_args()
+
+	server = InferenceServer(args.model, args.checkpoint, args.max_batch, args.max_wait)
+	clients = [server.client() for _ in range(args.workers)]
+	results = mp.Queue()
+	with server:
+		start = time.perf_counter()
+		workers = [mp.Process(target=play, args=(index, client, args.num_games, args.seed, results)) for index, client in enumerate(clients)]
+		for worker in workers:
+			worker.start()
+		scores = [results.get() for _ in range(args.workers * args.num_games)]
+		for worker in workers:
+			worker.join()
+		elapsed = time.perf_counter() - start
+		stats = server.stats()
+	print(f"{len(scores)} games, avg score {sum(scores) / len(scores):.2f}, {stats['rows'] / elapsed:.0f} moves/s")
+	print(format_stats(stats))
+
+if __name__ == "__main__":
+	main()
@@ -58,18 +58,55 @@ class Card:
 		CardSuit.knots:  "K"
 	}
 
-	def __init__(self, type, name, suits, identities = []):
-		self.type = type
-		self.name = name
-		self.suits = set(suits)
-		self.suits_list = suits
-		self.identities = set(identities)
-		self.str = ""
-		for s in self.suits_list:
-			self.str += Card.suit_map[s]
-		self.id = "%s%s" % (Card.type_map[self.type], self.str)
-		self.id = self.id.replace(" ", "")
-		self.str = "%s %-3s" % (Card.type_map[self.type], self.str)
+	__slots__ = ("type", "name", "suits", "suits_list", "identities", "str", "id", "index", "mask")
+
+	# Cards are interned flyweights: one immutable instance per (type, suits),
+	# numbered in creation order so the number can index card tables
+	registry = []
+	_interned = {}
+
+	def __new__(cls, type, name, suits, identities = []):
+		mask = 0
+		for s in suits:
+			mask |= 1 << s.value
+		key = (int(type), mask)
+		card = Card._interned.get(key)
+		if card is not None:
+			return card
+
+		card = super().__new__(cls)
+		str_suits = ""
+		for s in suits:
+			str_suits += Card.suit_map[s]
+		type = CardType(int(type))
+		object.__setattr__(card, "type", type)
+		object.__setattr__(card, "name", name)
+		object.__setattr__(card, "suits", frozenset(suits))
+		object.__setattr__(card, "suits_list", tuple(suits))
+		object.__setattr__(card, "identities", frozenset(identities))
+		object.__setattr__(card, "id", ("%s%s" % (Card.type_map[type], str_suits)).replace(" ", ""))
+		object.__setattr__(card, "str", "%s %-3s" % (Card.type_map[type], str_suits))
+		object.__setattr__(card, "index", len(Card.registry))
+		object.__setattr__(card, "mask", mask)
+		Card.registry.append(card)
+		Card._interned[key] = card
+		return card
+
+	@classmethod
+	def lookup(cls, type, mask):
+		return Card._interned.get((int(type), int(mask)))
+
+	def __setattr__(self, name, value):
+		raise AttributeError("Card is immutable")
+
+	def __copy__(self):
+		return self
+
+	def __deepcopy__(self, memo):
+		return self
+
+	def __reduce__(self):
+		return (Card, (self.type, self.name, self.suits_list, self.identities))
 
 	def __str__(self):
 		return self.str
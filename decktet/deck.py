@@ -1,11 +1,52 @@
 import os
+import random
+import numpy as np
 from decktet.card import Card, CardIdentity, CardSuit, CardType
 
 
 class Deck:
-	def __init__(self, cards):
-		self.cards = cards
-	
+	def __init__(self, cards, top=0):
+		# A deck is a permutation of card indexes plus a cursor. The
+		# permutation is an immutable tuple shared between copies.
+		self.order = tuple(card.index for card in cards)
+		self.top = top
+
+	@classmethod
+	def from_order(cls, order, top=0):
+		deck = cls.__new__(cls)
+		deck.order = order
+		deck.top = top
+		return deck
+
+	@property
+	def cards(self):
+		return tuple(Card.registry[idx] for idx in self.order[self.top:])
+
+	def __len__(self):
+		return len(self.order) - self.top
+
+	def copy(self):
+		return Deck.from_order(self.order, self.top)
+
+	def snapshot(self):
+		return self.order, self.top
+
+	@classmethod
+	def from_snapshot(cls, snapshot):
+		order, top = snapshot
+		return cls.from_order(order, top)
+
+	def shuffled(self, rng=None):
+		order = list(self.order[self.top:])
+		(rng or random).shuffle(order)
+		return Deck.from_order(tuple(order))
+
+	def peek(self, offset=0):
+		idx = self.top + offset
+		if idx < len(self.order):
+			return Card.registry[self.order[idx]]
+		return None
+
 	@classmethod
 	def make_extended(cls):
 		deck = Deck([
@@ -76,8 +117,10 @@ class Deck:
 		return deck
 
 	def take_card(self):
-		if len(self.cards) > 0:
-			return self.cards.pop(0)
+		if self.top < len(self.order):
+			card = Card.registry[self.order[self.top]]
+			self.top += 1
+			return card
 		return None
 
 	def check_assets(self):
@@ -85,3 +128,12 @@ class Deck:
 			fname = f"decktet/assets/{card.id}.png"
 			if not os.path.isfile(fname):
 				print(f"check_assets: {fname} is missing ({card.name})")
+
+
+# Card tables indexed by Card.index. Building the extended deck here interns
+# every card in a fixed order, so indexes are stable between runs.
+Deck.make_extended()
+CARD_COUNT = len(Card.registry)
+CARD_RANKS = np.array([card.type for card in Card.registry], dtype=np.int8)
+CARD_SUIT_MASKS = np.array([card.mask for card in Card.registry], dtype=np.uint8)
+CARD_SUITS = np.array([[suit in card.suits for suit in CardSuit] for card in Card.registry], dtype=np.bool_)
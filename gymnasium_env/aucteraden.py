@@ -1,9 +1,10 @@
 import os
+import random
 from typing import Optional
 
 import numpy as np
 
-from aucteraden.board import Board, GameState
+from aucteraden.board import Board, GameState, Variant
 from aucteraden.encoders import GameStateEncoder, MoveEncoder
 from decktet.card import Card, CardSuit
 import gymnasium as gym
@@ -18,14 +19,15 @@ class AucteradenEnv(gym.Env):
 		"render_fps": 1,
 	}
 
-	def __init__(self, render_mode: Optional[str] = None):
-		self.game_state_encoder = GameStateEncoder()
-		self.move_encoder = MoveEncoder()
+	def __init__(self, render_mode: Optional[str] = None, variant: Optional[Variant] = None):
+		self.variant = variant if variant is not None else Board.standard_variant
+		self.game_state_encoder = GameStateEncoder(self.variant)
+		self.move_encoder = MoveEncoder(self.variant)
 
-		arr = np.ones([10 + 16], dtype=np.int8) * 2
+		arr = np.ones(self.move_encoder.shape(), dtype=np.int8) * 2
 		self.action_space = spaces.MultiDiscrete(arr)
 		
-		arr = np.ones([6, 4, 5], dtype=np.int8) * 13
+		arr = np.ones(self.game_state_encoder.shape(), dtype=np.int8) * 13
 		self.observation_space = spaces.MultiDiscrete(arr)
 
 		self.render_mode = render_mode
@@ -33,7 +35,7 @@ class AucteradenEnv(gym.Env):
 		self.suit_image_cache = {}
 
 	def step(self, action):
-		print("step")
+		#print("step")
 		#assert self.action_space.contains(action)
 		terminated = False
 		reward = 0.0
@@ -46,13 +48,18 @@ class AucteradenEnv(gym.Env):
 		if self.render_mode == "human":
 			self.render()
 		# truncation=False as the time limit is handled by the `TimeLimit` wrapper added during `make`
-		result = (self._get_obs(), reward, terminated, False, {})
+		result = (self._get_obs(), reward, terminated, False, self._get_info())
 		#print(f"step: {result}")
 		return result
 
 	def _get_obs(self):
 		return self.game_state_encoder.encode(self.game.board)
 
+	def _get_info(self):
+		# The live engine board lets agents skip decoding the observation.
+		# It must be treated as read-only, copy() it to search ahead.
+		return {"board": self.game.board, "action_mask": self.game.board.legal_action_mask()}
+
 	def reset(
 		self,
 		seed: Optional[int] = None,
@@ -60,13 +67,15 @@ class AucteradenEnv(gym.Env):
 	):
 		super().reset(seed=seed)
 
-		print("reset")
+		#print("reset")
 
-		self.game = GameState.new_game()
+		# The deal is derived from the env's seeded generator
+		rng = random.Random(int(self.np_random.integers(1 << 63)))
+		self.game = GameState.new_game(rng=rng, variant=self.variant)
 
 		if self.render_mode == "human":
 			self.render()
-		result = (self._get_obs(), {})
+		result = (self._get_obs(), self._get_info())
 		#print(f"reset: {result}")
 		return result
 
@@ -93,10 +102,11 @@ class AucteradenEnv(gym.Env):
 		suit_img_height = 47
 		spacing = 10
 
-		screen_width, screen_height = 1300, (card_img_height + spacing) * 4 + spacing
+		screen_width = 628 + (card_img_width + spacing) * self.variant.col_count
+		screen_height = (card_img_height + spacing) * self.variant.row_count + spacing
 
 		market_x, market_y = spacing, spacing * 5
-		grid_x, grid_y = screen_width - (card_img_width + spacing) * 4, spacing
+		grid_x, grid_y = screen_width - (card_img_width + spacing) * self.variant.col_count, spacing
 
 		bg_color = (7, 99, 36)
 		white = (255, 255, 255)
@@ -167,7 +177,7 @@ class AucteradenEnv(gym.Env):
 					pygame.draw.lines(self.screen, suit_color[suit], False, lines, line_width)
 
 		# Cards in deck
-		draw_text(f"Deck: {len(self.game.board.deck.cards)}", font, spacing * 2, spacing)
+		draw_text(f"Deck: {len(self.game.board.deck)}", font, spacing * 2, spacing)
 
 		# Score
 		score, longest_chains = self.game.board.calculate_score()
@@ -189,8 +199,8 @@ class AucteradenEnv(gym.Env):
 			show_suit_chip(suit, count, spacing + suit_img_width * 2 * suit.value, market_y + card_img_height + spacing * 8)
 
 		# Grid
-		for row in range(Board.row_count):
-			for col in range(Board.col_count):
+		for row in range(self.variant.row_count):
+			for col in range(self.variant.col_count):
 				card = self.game.board.get_card(col, row)
 				img_id = "empty"
 				if card: